@@ -0,0 +1,70 @@
+"""Latency and memory per screen grab for each capture backend.
+
+Needs a desktop session. Memory comes from tracemalloc (NumPy and mss
+report their buffers to it): "peak" is the most allocated at once during
+the run beyond the warmed-up baseline, i.e. the transient cost of a grab;
+"kept" is what stays allocated afterwards.
+
+Usage: python bench/bench_capture.py [--repeat N] [--scope monitor|window] [--monitor N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from backends import MssCapture, PyAutoGuiCapture  # noqa: E402
+from config import CAPTURE_MONITOR, CAPTURE_SCOPE  # noqa: E402
+
+
+def _backends(scope, monitor):
+    yield "pyautogui", PyAutoGuiCapture(scope)
+    try:
+        yield "mss", MssCapture(scope, monitor)
+    except ImportError:
+        print("mss not installed; benchmarking pyautogui only")
+
+
+def _measure(grab, repeat):
+    grab()  # first grab allocates buffers and opens the display
+    samples = []
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        frame = grab()
+        samples.append((time.perf_counter() - t0) * 1000)
+        del frame
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return samples, max(0, current - base), max(0, peak - base)
+
+
+def _fmt(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"median {statistics.median(samples):7.1f} ms  p95 {p95:7.1f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=30)
+    ap.add_argument("--scope", default=CAPTURE_SCOPE, choices=["monitor", "window"])
+    ap.add_argument("--monitor", type=int, default=CAPTURE_MONITOR)
+    opts = ap.parse_args()
+
+    for name, backend in _backends(opts.scope, opts.monitor):
+        for kind, grab in (("bgr", backend.grab), ("gray", backend.grab_gray)):
+            shape = grab().shape
+            samples, kept, peak = _measure(grab, opts.repeat)
+            print(
+                f"{name:10s} {kind:5s} {shape[1]}x{shape[0]} at {backend.origin}  {_fmt(samples)}"
+                f"  peak {peak / 1e6:6.2f} MB  kept {kept / 1e6:6.2f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare OCR engines, and single-pass against tile-parallel OCR, on
+saved screen frames.
+
+Usage: python bench/bench_ocr.py FRAME_OR_DIR [...] [--repeat N]
+       [--tile-workers N [N ...]] [--tile-height PX] [--tile-overlap PX]
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import cv2  # noqa: E402
+
+import ocr  # noqa: E402
+from config import OCR_TILE_HEIGHT, OCR_TILE_OVERLAP  # noqa: E402
+
+
+def _frames(paths):
+    for p in paths:
+        if os.path.isdir(p):
+            yield from sorted(glob.glob(os.path.join(p, "*.png")))
+        else:
+            yield p
+
+
+def _time(fn, proc, repeat):
+    samples = []
+    words = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        data = fn(proc)
+        samples.append((time.perf_counter() - t0) * 1000)
+        words = sum(1 for t in data["text"] if str(t).strip())
+    return samples, words
+
+
+def _fmt(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"median {statistics.median(samples):8.1f} ms  p95 {p95:8.1f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("frames", nargs="+")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--tile-workers", type=int, nargs="*", default=[2, 4])
+    ap.add_argument("--tile-height", type=int, default=OCR_TILE_HEIGHT)
+    ap.add_argument("--tile-overlap", type=int, default=OCR_TILE_OVERLAP)
+    opts = ap.parse_args()
+
+    engines = [("pytesseract", ocr.image_to_data_pytesseract)]
+    if ocr.tesserocr is not None:
+        pool = ocr.TesseractPool(1, ocr.OCR_LANG)
+        pool.warm()
+        engines.append(("pool", pool.image_to_data))
+    else:
+        print("tesserocr not installed; benchmarking pytesseract only")
+    engines.append(("single", ocr.image_to_data))
+    for n in opts.tile_workers:
+        ocr.warm_tiles(n)
+        engines.append((
+            f"tiles x{n}",
+            lambda proc, n=n: ocr.image_to_data_tiled(proc, n, opts.tile_height, opts.tile_overlap),
+        ))
+
+    totals = {name: [] for name, _ in engines}
+    for path in _frames(opts.frames):
+        img = cv2.imread(path)
+        if img is None:
+            print(f"skip unreadable {path}")
+            continue
+        proc, _ = ocr.preprocess(img)
+        bands = len(ocr.tile_bands(proc, opts.tile_height, opts.tile_overlap))
+        print(f"{path}  ({bands} bands)")
+        for name, fn in engines:
+            samples, words = _time(fn, proc, opts.repeat)
+            totals[name].extend(samples)
+            print(f"  {name:12s} {_fmt(samples)}  words {words}")
+
+    print("overall")
+    single = statistics.median(totals["single"]) if totals["single"] else 0.0
+    for name, samples in totals.items():
+        if samples:
+            speedup = single / statistics.median(samples) if single else 0.0
+            print(f"  {name:12s} {_fmt(samples)}  x{speedup:4.2f} vs single")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Time module imports in fresh interpreters.
+
+"main" is what the GUI pays before its window can appear; "vision_steps"
+is the vision stack loaded on the first locate step (or by the warm-up).
+
+Usage: python bench/bench_startup.py [--repeat N] [module ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {src!r}); t0 = time.perf_counter(); "
+    "import {module}; print(time.perf_counter() - t0)"
+)
+
+
+def _time_import(module):
+    out = subprocess.run(
+        [sys.executable, "-c", _SNIPPET.format(src=SRC, module=module)],
+        capture_output=True,
+        text=True,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return float(out.stdout.strip()) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("modules", nargs="*", default=["main", "runner", "cli", "vision_steps"])
+    ap.add_argument("--repeat", type=int, default=5)
+    opts = ap.parse_args()
+
+    for module in opts.modules:
+        try:
+            samples = [_time_import(module) for _ in range(opts.repeat)]
+        except RuntimeError as e:
+            print(f"  {module:14s} failed: {e}")
+            continue
+        print(f"  {module:14s} median {statistics.median(samples):8.1f} ms  max {max(samples):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
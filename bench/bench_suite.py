@@ -0,0 +1,180 @@
+"""Offline latency benchmarks on fake backends (runs headless).
+
+Replays a recorded corpus (see src/fakes.py, bench/record_corpus.py) or,
+without --corpus, a synthetic one drawn with OpenCV. Input events are
+recorded instead of sent, so nothing touches the real desktop.
+
+Usage: python bench/bench_suite.py [--corpus DIR] [--repeat N] [--json OUT]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+import fakes  # noqa: E402
+from agent import parse_actions  # noqa: E402
+from capture import invalidate_frame  # noqa: E402
+from config import ALLOWLIST_APPS  # noqa: E402
+from guardrails import danger_reason, invalidate_window_cache, is_allowed_window  # noqa: E402
+from ocr import DATA_KEYS, OCR_CACHE  # noqa: E402
+from plan import compile_text  # noqa: E402
+from runner import PlanRunner, RunHooks  # noqa: E402
+from vision import locate_image, locate_text  # noqa: E402
+
+WORDS = ["File", "Edit", "View", "Search", "Settings", "Help", "Save", "Cancel", "Open", "Export"]
+
+
+def _synthetic_corpus(frames=6, size=(1280, 800)):
+    w, h = size
+    rng = np.random.default_rng(0)
+    imgs, tables = [], []
+    for f in range(frames):
+        img = np.full((h, w, 3), 245, np.uint8)
+        data = {k: [] for k in DATA_KEYS}
+        for line in range(20):
+            x, y = 20, 40 + line * 36
+            for word in rng.choice(WORDS, 6):
+                word = str(word)
+                (tw, th), base = cv2.getTextSize(word, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+                cv2.putText(img, word, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (20, 20, 20), 2)
+                for k, v in (
+                    ("level", 5), ("page_num", 1), ("block_num", 1), ("par_num", 1),
+                    ("line_num", line + 1), ("word_num", len(data["text"]) + 1),
+                    ("left", x), ("top", y - th), ("width", tw), ("height", th + base),
+                    ("conf", 95), ("text", word),
+                ):
+                    data[k].append(v)
+                x += tw + 18
+        # A distinctive icon that moves from frame to frame
+        ix, iy = 900 + 20 * f, 100 + 30 * f
+        cv2.rectangle(img, (ix, iy), (ix + 48, iy + 48), (40, 120, 200), -1)
+        cv2.circle(img, (ix + 24, iy + 24), 14, (250, 250, 250), -1)
+        cv2.line(img, (ix + 8, iy + 40), (ix + 40, iy + 8), (10, 10, 10), 3)
+        img.setflags(write=False)
+        imgs.append(img)
+        tables.append(data)
+    titles = [f"untitled - {ALLOWLIST_APPS[0]}"] * frames
+    return fakes.Corpus(imgs, tables, titles)
+
+
+def _percentiles(samples):
+    s = sorted(samples)
+
+    def pick(p):
+        return s[min(len(s) - 1, int(len(s) * p))]
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "n": len(s)}
+
+
+def _time(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _cold():
+    invalidate_frame()
+    OCR_CACHE.clear()
+
+
+def _script(steps):
+    lines = ["pacing fast"]
+    for i in range(steps):
+        word = WORDS[i % len(WORDS)]
+        lines.extend([
+            f"locate_text {word}",
+            f"type hello {i}",
+            "hotkey ctrl+s",
+            f"click {100 + i} {200 + i}",
+        ])
+    return "\n".join(lines)
+
+
+class _AllowAll(RunHooks):
+    def __init__(self):
+        self.done = threading.Event()
+
+    def confirm_danger(self, reason):
+        return True
+
+    def ensure_app_allowed(self, app):
+        return True
+
+    def ensure_window_allowed(self):
+        return True
+
+    def continue_after_fail(self, reason):
+        return True
+
+    def finished(self, job):
+        self.done.set()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--plan-steps", type=int, default=25)
+    ap.add_argument("--json", dest="json_out")
+    opts = ap.parse_args()
+
+    corpus = fakes.Corpus.load(opts.corpus) if opts.corpus else _synthetic_corpus()
+    recorder = fakes.install(corpus)
+    query = next((t for t in (corpus.frame_words or {}).get("text", []) if str(t).strip()), WORDS[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Template cut from the first frame, so locate_image has a real hit
+        icon = os.path.join(tmp, "icon.png")
+        h, w = corpus.frame.shape[:2]
+        cv2.imwrite(icon, corpus.frame[h // 8:h // 8 + 48, w * 7 // 10:w * 7 // 10 + 48])
+
+        script = _script(opts.plan_steps)
+        actions = parse_actions(script)
+        results = {
+            "parse_actions": _time(lambda: parse_actions(script), opts.repeat),
+            "guardrails": _time(
+                lambda: [danger_reason(a) for a in actions] and is_allowed_window(),
+                opts.repeat,
+                invalidate_window_cache,
+            ),
+            "locate_text cold": _time(lambda: locate_text(query), opts.repeat, _cold),
+            "locate_text cached": _time(lambda: locate_text(query), opts.repeat, invalidate_frame),
+            "locate_image": _time(lambda: locate_image(icon), opts.repeat, invalidate_frame),
+        }
+
+        runner = PlanRunner(ALLOWLIST_APPS)
+        plan_samples = []
+        for _ in range(max(1, opts.repeat // 10)):
+            corpus.rewind()
+            hooks = _AllowAll()
+            t0 = time.perf_counter()
+            runner.submit(compile_text(script), hooks)
+            hooks.done.wait()
+            plan_samples.append((time.perf_counter() - t0) * 1000)
+        results[f"plan ({len(actions)} steps)"] = plan_samples
+
+    report = {name: _percentiles(samples) for name, samples in results.items()}
+    print(f"{'benchmark':24s} {'p50 ms':>10s} {'p90 ms':>10s} {'p99 ms':>10s} {'n':>5s}")
+    for name, p in report.items():
+        print(f"{name:24s} {p['p50']:10.2f} {p['p90']:10.2f} {p['p99']:10.2f} {p['n']:5d}")
+    print(f"input events recorded: {len(recorder.events)}")
+    if opts.json_out:
+        with open(opts.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
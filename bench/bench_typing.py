@@ -0,0 +1,45 @@
+"""Measure text entry throughput of each typing mode.
+
+Focus a scratch editor (e.g. Notepad) during the countdown; every mode
+types the same generated text into it.
+
+Usage: python bench/bench_typing.py [--chars N] [--modes paste,batch,char] [--delay S]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from backends import get_input  # noqa: E402
+from textentry import MODES, type_text  # noqa: E402
+
+
+def _text(chars):
+    line = "The quick brown fox jumps over the lazy dog 0123456789.\n"
+    return (line * (chars // len(line) + 1))[:chars]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=5000)
+    ap.add_argument("--modes", default="paste,batch,char")
+    ap.add_argument("--delay", type=float, default=5.0)
+    opts = ap.parse_args()
+
+    modes = [m for m in opts.modes.split(",") if m in MODES]
+    text = _text(opts.chars)
+    print(f"focus the target window; starting in {opts.delay:.0f}s")
+    time.sleep(opts.delay)
+
+    for mode in modes:
+        t0 = time.perf_counter()
+        type_text(text, mode)
+        elapsed = time.perf_counter() - t0
+        print(f"  {mode:6s} {len(text):7d} chars  {elapsed:8.2f} s  {len(text) / elapsed:10.0f} chars/s")
+        get_input().write("\n", 0)
+
+
+if __name__ == "__main__":
+    main()
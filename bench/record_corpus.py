@@ -0,0 +1,41 @@
+"""Record a replay corpus from the live desktop for bench_suite.py.
+
+Saves one frame every --interval seconds, its OCR word table and the
+active window title. Use the desktop as usual while it records.
+
+Usage: python bench/record_corpus.py OUT_DIR [--frames N] [--interval S]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from backends import get_capture, get_ocr, get_window  # noqa: E402
+from fakes import Corpus  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("out")
+    ap.add_argument("--frames", type=int, default=10)
+    ap.add_argument("--interval", type=float, default=2.0)
+    opts = ap.parse_args()
+
+    frames, words, titles = [], [], []
+    for i in range(opts.frames):
+        # Grabs are owned arrays; the copy keeps that true for any backend
+        frame = get_capture().grab().copy()
+        title, _ = get_window().active_window()
+        frames.append(frame)
+        words.append(get_ocr().read(frame))
+        titles.append(title)
+        print(f"frame {i}: {title!r}, {sum(1 for t in words[-1]['text'] if str(t).strip())} words")
+        time.sleep(opts.interval)
+    Corpus(frames, words, titles).save(opts.out)
+    print(f"saved {len(frames)} frames to {opts.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Action names shared by the modules that treat groups of actions alike
+
+LOCATE_ACTIONS = ("locate_text", "locate_texts", "locate_image", "locate_any_image")
+# Poll the screen until something changes or disappears
+WAIT_ACTIONS = ("wait_for_change", "wait_until_text_gone")
+VISION_ACTIONS = LOCATE_ACTIONS + WAIT_ACTIONS
+# Vision actions that read the screen with OCR
+OCR_ACTIONS = ("locate_text", "locate_texts", "wait_until_text_gone")
@@ -1,6 +1,9 @@
+import itertools
 import json
 import re
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+ErrorCallback = Callable[[int, str], None]
 
 
 def _strip_code_fences(text: str) -> str:
@@ -26,62 +29,175 @@ def _parse_json(text: str) -> List[Dict[str, Any]]:
     return []
 
 
-def _parse_line(line: str) -> Dict[str, Any]:
-    line = line.strip()
-    if not line:
-        return {}
+def _open_app(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "open_app", "args": {"app": m.group(1).strip()}}
 
-    line = re.sub(r"^[-*]\s+", "", line)
 
-    m = re.match(r"^(open|open_app)\s+(.+)$", line, re.I)
-    if m:
-        return {"action": "open_app", "args": {"app": m.group(2).strip()}}
+def _click(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "click", "args": {"x": int(m.group(1)), "y": int(m.group(2))}}
 
-    m = re.match(r"^click\s+(\d+)\s*[ ,]\s*(\d+)$", line, re.I)
-    if m:
-        return {"action": "click", "args": {"x": int(m.group(1)), "y": int(m.group(2))}}
 
-    m = re.match(r"^type\s*[:=]?\s+(.+)$", line, re.I)
-    if m:
-        return {"action": "type", "args": {"text": m.group(1)}}
+def _type(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "type", "args": {"text": m.group(1)}}
 
-    m = re.match(r"^(hotkey|press|keys)\s+(.+)$", line, re.I)
-    if m:
-        keys = [k.strip().upper() for k in re.split(r"\+|\s+", m.group(2)) if k.strip()]
-        return {"action": "hotkey", "args": {"keys": keys}}
 
-    m = re.match(r"^(sleep|wait)\s+([0-9]*\.?[0-9]+)$", line, re.I)
-    if m:
-        return {"action": "sleep", "args": {"seconds": float(m.group(2))}}
+def _hotkey(m: "re.Match[str]") -> Dict[str, Any]:
+    keys = [k.strip().upper() for k in _KEY_SPLIT.split(m.group(1)) if k.strip()]
+    return {"action": "hotkey", "args": {"keys": keys}}
+
+
+def _wait_for_change(m: "re.Match[str]") -> Dict[str, Any]:
+    args = {"timeout": float(m.group(1))} if m.group(1) else {}
+    return {"action": "wait_for_change", "args": args}
+
+
+def _wait_until_text_gone(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "wait_until_text_gone", "args": {"text": m.group(1).strip().strip("\"")}}
+
+
+def _sleep(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "sleep", "args": {"seconds": float(m.group(1))}}
+
+
+def _scroll(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "scroll", "args": {"amount": int(m.group(1))}}
+
+
+def _pacing(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "pacing", "args": {"profile": m.group(1).strip()}}
+
+
+def _locate_text(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "locate_text", "args": {"text": m.group(1).strip().strip("\"")}}
+
+
+def _locate_texts(m: "re.Match[str]") -> Dict[str, Any]:
+    texts = [t.strip().strip("\"") for t in m.group(1).split("|") if t.strip()]
+    return {"action": "locate_texts", "args": {"texts": texts}}
+
 
-    m = re.match(r"^scroll\s+(-?\d+)$", line, re.I)
-    if m:
-        return {"action": "scroll", "args": {"amount": int(m.group(1))}}
+def _locate_image(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "locate_image", "args": {"path": m.group(1).strip().strip("\"")}}
 
-    m = re.match(r"^(locate_text|find_text)\s+(.+)$", line, re.I)
-    if m:
-        return {"action": "locate_text", "args": {"text": m.group(2).strip().strip("\"")}}
 
-    m = re.match(r"^(locate_image|find_image)\s+(.+)$", line, re.I)
-    if m:
-        return {"action": "locate_image", "args": {"path": m.group(2).strip().strip("\"")}}
+def _locate_any_image(m: "re.Match[str]") -> Dict[str, Any]:
+    return {"action": "locate_any_image", "args": {"dir": m.group(1).strip().strip("\"")}}
 
-    if re.match(r"^[A-Za-z]+\+[A-Za-z0-9]+$", line):
+
+_KEY_SPLIT = re.compile(r"\+|\s+")
+_REST = re.compile(r"\s+(.+)$")
+_NUMBER = re.compile(r"\s+([0-9]*\.?[0-9]+)$")
+_COMBO = re.compile(r"^[A-Za-z]+\+[A-Za-z0-9]+$")
+_KEYWORD_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_"
+
+# Leading keyword (lowercase) -> (pattern for the rest of the line, builder)
+_DISPATCH: Dict[str, Tuple["re.Pattern[str]", Callable[["re.Match[str]"], Dict[str, Any]]]] = {}
+
+
+def _register(keywords: str, pattern: "re.Pattern[str]", build: Callable[["re.Match[str]"], Dict[str, Any]]) -> None:
+    for k in keywords.split():
+        _DISPATCH[k] = (pattern, build)
+
+
+_register("open open_app", _REST, _open_app)
+_register("click", re.compile(r"\s+(\d+)\s*[ ,]\s*(\d+)$"), _click)
+_register("type", re.compile(r"\s*[:=]?\s+(.+)$"), _type)
+_register("hotkey press keys", _REST, _hotkey)
+_register("wait_for_change", re.compile(r"(?:\s+([0-9]*\.?[0-9]+))?$"), _wait_for_change)
+_register("wait_until_text_gone wait_gone", _REST, _wait_until_text_gone)
+_register("sleep wait", _NUMBER, _sleep)
+_register("scroll", re.compile(r"\s+(-?\d+)$"), _scroll)
+_register("pacing pace", _REST, _pacing)
+_register("locate_text find_text", _REST, _locate_text)
+_register("locate_texts find_texts", _REST, _locate_texts)
+_register("locate_image find_image", _REST, _locate_image)
+_register("locate_any_image find_any_image", _REST, _locate_any_image)
+
+
+def _parse_line(line: str) -> Dict[str, Any]:
+    line = line.strip()
+    if not line:
+        return {}
+
+    if line[0] in "-*" and len(line) > 1 and line[1].isspace():
+        line = line[1:].lstrip()
+
+    rest = line.lstrip(_KEYWORD_CHARS)
+    entry = _DISPATCH.get(line[:len(line) - len(rest)].lower())
+    if entry:
+        m = entry[0].match(rest)
+        if m:
+            return entry[1](m)
+
+    if _COMBO.match(line):
         keys = [k.strip().upper() for k in line.split("+")]
         return {"action": "hotkey", "args": {"keys": keys}}
 
     return {}
 
 
-def parse_actions(text: str) -> List[Dict[str, Any]]:
-    text = _strip_code_fences(text)
-    actions = _parse_json(text)
-    if actions:
-        return actions
-
-    result = []
-    for line in text.splitlines():
-        action = _parse_line(line)
+def _decode_json_array(text: str) -> List[Any]:
+    # Deliberately not incremental: the whole array is decoded before any
+    # step is handed out, so a malformed or truncated plan runs nothing.
+    # Iterable sources are joined into one string anyway, so streaming the
+    # items would only save parse time, which is negligible next to running
+    # the steps. Like json.loads, text after the closing bracket makes the
+    # whole body invalid JSON; iter_actions then falls back to line parsing.
+    try:
+        items, end = json.JSONDecoder().raw_decode(text, text.index("["))
+    except json.JSONDecodeError as e:
+        raise ValueError(e.msg)
+    if text[end:].strip():
+        raise ValueError("extra data after JSON array")
+    return items
+
+
+def _iter_lines(lines: Iterable[str], on_error: Optional[ErrorCallback]) -> Iterator[Dict[str, Any]]:
+    for lineno, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("```"):
+            continue
+        action = _parse_line(stripped)
         if action:
-            result.append(action)
-    return result
+            yield action
+        elif on_error:
+            on_error(lineno, stripped)
+
+
+def iter_actions(source: Union[str, Iterable[str]], on_error: Optional[ErrorCallback] = None) -> Iterator[Any]:
+    # Yields actions as soon as they are parsed. on_error(lineno, line) is
+    # called for every non-empty line that was skipped.
+    if not isinstance(source, str):
+        lines = iter(source)
+        head: List[str] = []
+        for line in lines:
+            head.append(line)
+            stripped = line.strip()
+            if stripped and not stripped.startswith("```"):
+                break
+        if head and head[-1].lstrip()[:1] in ("[", "{"):
+            source = "".join(head) + "".join(lines)
+        else:
+            yield from _iter_lines(itertools.chain(head, lines), on_error)
+            return
+
+    text = _strip_code_fences(source)
+    first = text[:1]
+    if first == "[":
+        try:
+            actions = _decode_json_array(text)
+        except ValueError:
+            pass
+        else:
+            yield from actions
+            return
+    elif first == "{":
+        actions = _parse_json(text)
+        if actions:
+            yield from actions
+            return
+    yield from _iter_lines(source.splitlines(), on_error)
+
+
+def parse_actions(text: str) -> List[Dict[str, Any]]:
+    return list(iter_actions(text))
@@ -0,0 +1,313 @@
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from config import CAPTURE_BACKEND, CAPTURE_MONITOR, CAPTURE_SCOPE, FAILSAFE
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Screen-space rectangle as (left, top, width, height)
+Rect = Tuple[int, int, int, int]
+
+
+class CaptureBackend:
+    # Every grab returns an array the caller owns: the backend never writes
+    # to it again, so frames may be kept (cached, recorded) indefinitely.
+
+    # Screen position of the last frame's top-left pixel; read it under the
+    # same lock as the grab (capture.py does).
+    origin: Tuple[int, int] = (0, 0)
+
+    def grab(self) -> "np.ndarray":
+        # Captured area as a BGR array.
+        raise NotImplementedError
+
+    def grab_gray(self) -> "np.ndarray":
+        # Captured area as a single-channel array.
+        import cv2
+
+        return cv2.cvtColor(self.grab(), cv2.COLOR_BGR2GRAY)
+
+
+class OcrBackend:
+    # Part of the OCR cache key, so results from different engines or
+    # settings never mix.
+    tag = ""
+
+    def read(self, img: "np.ndarray", origin: Tuple[int, int] = (0, 0)) -> Dict[str, Any]:
+        # Word table (pytesseract image_to_data layout) with boxes in the
+        # coordinates of img; origin is where img sits on the screen.
+        raise NotImplementedError
+
+
+class InputBackend:
+    def click(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def move_to(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def write(self, text: str, interval: float) -> None:
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def scroll(self, amount: int) -> None:
+        raise NotImplementedError
+
+    def screen_size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def get_clipboard(self) -> str:
+        raise NotImplementedError
+
+    def set_clipboard(self, text: str) -> None:
+        raise NotImplementedError
+
+
+class WindowBackend:
+    def foreground_handle(self) -> Optional[int]:
+        # Cheap focus probe; None when the platform has none.
+        return None
+
+    def active_window(self) -> Tuple[str, Optional[Rect]]:
+        raise NotImplementedError
+
+
+def _window_rect(bounds: Optional[Rect] = None) -> Optional[Rect]:
+    # Active window rect clipped to bounds, or None if nothing is left.
+    # Goes through the guardrails window cache (re-read on focus change).
+    from guardrails import active_window_rect
+
+    rect = active_window_rect()
+    if rect is None:
+        return None
+    x0, y0, x1, y1 = rect[0], rect[1], rect[0] + rect[2], rect[1] + rect[3]
+    if bounds is not None:
+        x0, y0 = max(x0, bounds[0]), max(y0, bounds[1])
+        x1, y1 = min(x1, bounds[0] + bounds[2]), min(y1, bounds[1] + bounds[3])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class PyAutoGuiCapture(CaptureBackend):
+    def __init__(self, scope: str = CAPTURE_SCOPE) -> None:
+        import cv2
+        import numpy
+        import pyautogui
+
+        self._cv2 = cv2
+        self._np = numpy
+        self._pyautogui = pyautogui
+        self.scope = scope
+
+    def _screenshot(self) -> "np.ndarray":
+        rect = _window_rect() if self.scope == "window" else None
+        if rect is None:
+            self.origin = (0, 0)
+            return self._np.asarray(self._pyautogui.screenshot())
+        self.origin = (rect[0], rect[1])
+        return self._np.asarray(self._pyautogui.screenshot(region=rect))
+
+    def grab(self) -> "np.ndarray":
+        return self._cv2.cvtColor(self._screenshot(), self._cv2.COLOR_RGB2BGR)
+
+    def grab_gray(self) -> "np.ndarray":
+        return self._cv2.cvtColor(self._screenshot(), self._cv2.COLOR_RGB2GRAY)
+
+
+class MssCapture(CaptureBackend):
+    # mss grabs into its own buffer (using X11 shared memory on versions
+    # that implement it); that buffer is viewed as BGRA without a copy and
+    # converted in one pass into the returned BGR or gray frame.
+
+    def __init__(self, scope: str = CAPTURE_SCOPE, monitor: int = CAPTURE_MONITOR) -> None:
+        import cv2
+        import mss
+        import numpy
+
+        self._cv2 = cv2
+        self._mss = mss
+        self._np = numpy
+        self.scope = scope
+        self.monitor = monitor
+        self._lock = threading.Lock()
+        # mss handles are per thread (the runner, prefetcher and UI all grab)
+        self._local = threading.local()
+
+    def _sct(self) -> Any:
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = self._mss.mss()
+        return sct
+
+    def _area(self, sct: Any) -> Dict[str, int]:
+        monitors = sct.monitors
+        mon = monitors[self.monitor] if 0 <= self.monitor < len(monitors) else monitors[min(1, len(monitors) - 1)]
+        if self.scope == "window":
+            full = monitors[0]
+            rect = _window_rect((full["left"], full["top"], full["width"], full["height"]))
+            if rect is not None:
+                return {"left": rect[0], "top": rect[1], "width": rect[2], "height": rect[3]}
+        return {"left": mon["left"], "top": mon["top"], "width": mon["width"], "height": mon["height"]}
+
+    def _grab(self, code: int) -> "np.ndarray":
+        with self._lock:
+            sct = self._sct()
+            area = self._area(sct)
+            shot = sct.grab(area)
+            bgra = self._np.frombuffer(shot.raw, self._np.uint8).reshape(shot.height, shot.width, 4)
+            self.origin = (area["left"], area["top"])
+            return self._cv2.cvtColor(bgra, code)
+
+    def grab(self) -> "np.ndarray":
+        return self._grab(self._cv2.COLOR_BGRA2BGR)
+
+    def grab_gray(self) -> "np.ndarray":
+        return self._grab(self._cv2.COLOR_BGRA2GRAY)
+
+
+class TesseractOcr(OcrBackend):
+    def __init__(self) -> None:
+        import ocr
+
+        self._ocr = ocr
+        self.tag = f"tesseract:{ocr.TESSERACT_CONFIG}"
+
+    def read(self, img: "np.ndarray", origin: Tuple[int, int] = (0, 0)) -> Dict[str, Any]:
+        return self._ocr.read_text(img)
+
+
+class PyAutoGuiInput(InputBackend):
+    def __init__(self) -> None:
+        import pyautogui
+        import pyperclip
+
+        pyautogui.FAILSAFE = FAILSAFE
+        # Delays between steps come from the runner's pacing profile instead
+        pyautogui.PAUSE = 0
+        self._pyautogui = pyautogui
+        self._pyperclip = pyperclip
+
+    def click(self, x: int, y: int) -> None:
+        self._pyautogui.click(x, y)
+
+    def move_to(self, x: int, y: int) -> None:
+        self._pyautogui.moveTo(x, y)
+
+    def write(self, text: str, interval: float) -> None:
+        self._pyautogui.write(text, interval=interval)
+
+    def hotkey(self, *keys: str) -> None:
+        self._pyautogui.hotkey(*keys)
+
+    def scroll(self, amount: int) -> None:
+        self._pyautogui.scroll(amount)
+
+    def screen_size(self) -> Tuple[int, int]:
+        w, h = self._pyautogui.size()
+        return int(w), int(h)
+
+    def get_clipboard(self) -> str:
+        return self._pyperclip.paste() or ""
+
+    def set_clipboard(self, text: str) -> None:
+        self._pyperclip.copy(text)
+
+
+class PyGetWindowBackend(WindowBackend):
+    def __init__(self) -> None:
+        import ctypes
+
+        import pygetwindow
+
+        self._gw = pygetwindow
+        try:
+            self._get_foreground = ctypes.windll.user32.GetForegroundWindow
+        except AttributeError:
+            self._get_foreground = None
+
+    def foreground_handle(self) -> Optional[int]:
+        if self._get_foreground is None:
+            return None
+        try:
+            return self._get_foreground()
+        except Exception:
+            return None
+
+    def active_window(self) -> Tuple[str, Optional[Rect]]:
+        title = ""
+        rect = None
+        try:
+            win = self._gw.getActiveWindow()
+            if win:
+                title = win.title or ""
+                if win.width > 0 and win.height > 0:
+                    rect = (int(win.left), int(win.top), int(win.width), int(win.height))
+        except Exception:
+            pass
+        return title, rect
+
+
+def _default_capture() -> CaptureBackend:
+    if CAPTURE_BACKEND in ("auto", "mss"):
+        try:
+            return MssCapture()
+        except ImportError:
+            if CAPTURE_BACKEND == "mss":
+                raise
+    return PyAutoGuiCapture()
+
+
+_DEFAULTS = {
+    "capture": _default_capture,
+    "ocr": TesseractOcr,
+    "input": PyAutoGuiInput,
+    "window": PyGetWindowBackend,
+}
+_active: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _get(kind: str) -> Any:
+    backend = _active.get(kind)
+    if backend is None:
+        with _lock:
+            backend = _active.get(kind)
+            if backend is None:
+                backend = _DEFAULTS[kind]()
+                _active[kind] = backend
+    return backend
+
+
+def get_capture() -> CaptureBackend:
+    return _get("capture")
+
+
+def get_ocr() -> OcrBackend:
+    return _get("ocr")
+
+
+def get_input() -> InputBackend:
+    return _get("input")
+
+
+def get_window() -> WindowBackend:
+    return _get("window")
+
+
+def set_backends(
+    capture: Optional[CaptureBackend] = None,
+    ocr: Optional[OcrBackend] = None,
+    input_backend: Optional[InputBackend] = None,
+    window: Optional[WindowBackend] = None,
+) -> None:
+    # Replace the given backends (the rest keep their current ones). The
+    # real ones are created on first use, so nothing here imports
+    # pyautogui or pygetwindow until they are actually needed.
+    with _lock:
+        for kind, backend in (("capture", capture), ("ocr", ocr), ("input", input_backend), ("window", window)):
+            if backend is not None:
+                _active[kind] = backend
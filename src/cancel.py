@@ -0,0 +1,4 @@
+import threading
+
+# Set by the plan runner to abort any wait or delay in progress
+CANCEL = threading.Event()
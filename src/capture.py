@@ -0,0 +1,64 @@
+import hashlib
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from backends import get_capture
+from config import FRAME_TTL
+from tracing import span
+
+
+# Screen position of a frame's top-left pixel
+Origin = Tuple[int, int]
+
+
+class _FrameCache:
+    # The last gray capture; every vision path works on gray frames.
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.gray: Optional[np.ndarray] = None
+        self.origin: Origin = (0, 0)
+        self.taken_at = 0.0
+
+
+_cache = _FrameCache()
+
+
+def _capture() -> Tuple[np.ndarray, Origin]:
+    backend = get_capture()
+    with span("capture"):
+        img = backend.grab_gray()
+    img.setflags(write=False)
+    return img, backend.origin
+
+
+def grab_gray_at(max_age: Optional[float] = None) -> Tuple[np.ndarray, Origin]:
+    # Shared grayscale frame and its screen origin; callers must treat the
+    # frame as read-only.
+    ttl = FRAME_TTL if max_age is None else max_age
+    with _cache.lock:
+        if _cache.gray is not None and time.time() - _cache.taken_at <= ttl:
+            return _cache.gray, _cache.origin
+        gray, origin = _capture()
+        _cache.gray = gray
+        _cache.origin = origin
+        _cache.taken_at = time.time()
+        return gray, origin
+
+
+def invalidate_frame() -> None:
+    with _cache.lock:
+        _cache.gray = None
+
+
+def frame_fingerprint(img: np.ndarray) -> str:
+    # Area downsampling keeps single-glyph changes visible in the hash
+    # while hashing ~1/16 of the pixels.
+    h, w = img.shape[:2]
+    small = cv2.resize(img, (max(1, w // 4), max(1, h // 4)), interpolation=cv2.INTER_AREA)
+    digest = hashlib.blake2b(small.tobytes(), digest_size=16)
+    digest.update(f"{w}x{h}".encode())
+    return digest.hexdigest()
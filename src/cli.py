@@ -0,0 +1,186 @@
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from config import ALLOWLIST_APPS, CLI_POLICY, CLI_SCRIPT_PATTERN
+from guardrails import active_window_title, is_allowed_app, is_allowed_window
+from plan import Step, compile_text
+from runner import Job, PlanRunner, RunHooks
+
+
+class PolicyHooks(RunHooks):
+    # Answers every question from a fixed policy and reports one record
+    # per step (and per blocked step or skipped line) through write().
+
+    def __init__(self, script: str, policy: Dict[str, bool], allowlist: List[str]) -> None:
+        self.script = script
+        self.policy = policy
+        self.allowlist = allowlist
+        self.done = threading.Event()
+        self.current: Optional[Step] = None
+        self.step_started = 0.0
+        self.started = time.perf_counter()
+        self.failed = 0
+        self.blocked = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _block(self, reason: str) -> bool:
+        self.blocked += 1
+        step = self.current
+        self.write({
+            "step": step.index if step else None,
+            "action": step.action if step else None,
+            "ok": False,
+            "blocked": reason,
+        })
+        return False
+
+    def skipped_line(self, lineno: int, line: str) -> None:
+        self.write({"event": "skipped_line", "line": lineno, "text": line})
+
+    def progress(self, index: int, total: Optional[int], step: Step) -> None:
+        self.current = step
+        self.step_started = time.perf_counter()
+
+    def confirm_danger(self, reason: str) -> bool:
+        return self.policy["allow_danger"] or self._block(f"dangerous: {reason}")
+
+    def ensure_app_allowed(self, app: str) -> bool:
+        if is_allowed_app(app, allowlist=self.allowlist) or self.policy["allow_unlisted_apps"]:
+            return True
+        return self._block(f"app not in allowlist: {app}")
+
+    def ensure_window_allowed(self) -> bool:
+        if is_allowed_window(self.allowlist) or self.policy["allow_unlisted_windows"]:
+            return True
+        return self._block(f"active window not in allowlist: {active_window_title() or 'unknown'}")
+
+    def continue_after_fail(self, reason: str) -> bool:
+        return self.policy["continue_on_fail"]
+
+    def step_done(self, index: int, step: Step, ok: bool, msg: str) -> None:
+        if not ok:
+            self.failed += 1
+        self.write({
+            "step": index,
+            "action": step.action,
+            "ok": ok,
+            "msg": msg,
+            "ms": round((time.perf_counter() - self.step_started) * 1000, 1),
+        })
+
+    def finished(self, job: Job) -> None:
+        self.write({
+            "event": "finished",
+            "state": job.state,
+            "steps": len(job.results),
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "ms": round((time.perf_counter() - self.started) * 1000, 1),
+        })
+        self.done.set()
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0 and self.blocked == 0
+
+
+class CliHooks(PolicyHooks):
+    # Records go to out as JSON Lines; runner log lines to stderr if verbose.
+
+    def __init__(
+        self,
+        script: str,
+        policy: Dict[str, bool],
+        allowlist: List[str],
+        out: IO[str],
+        out_lock: threading.Lock,
+        verbose: bool,
+    ) -> None:
+        super().__init__(script, policy, allowlist)
+        self.out = out
+        self.out_lock = out_lock
+        self.verbose = verbose
+
+    def write(self, record: Dict[str, Any]) -> None:
+        record = {"script": self.script, **record}
+        with self.out_lock:
+            self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.out.flush()
+
+    def log(self, text: str) -> None:
+        if self.verbose:
+            print(f"{self.script}: {text}", file=sys.stderr)
+
+
+def iter_scripts(paths: List[str], pattern: str) -> Iterator[Tuple[str, str]]:
+    # (name, text) for each script; "-" reads stdin, directories yield
+    # their matching files in name order.
+    for path in paths:
+        if path == "-":
+            yield "<stdin>", sys.stdin.read()
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full = os.path.join(path, name)
+                if os.path.isfile(full) and fnmatch.fnmatch(name, pattern):
+                    yield from iter_scripts([full], pattern)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                yield path, f.read()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Run action scripts without the GUI.")
+    ap.add_argument("scripts", nargs="*", default=["-"], help="script files, directories, or - for stdin")
+    ap.add_argument("--out", help="JSON Lines results file (default: stdout)")
+    ap.add_argument("--pattern", default=CLI_SCRIPT_PATTERN, help="file pattern inside directories")
+    ap.add_argument("--allow", action="append", default=[], help="extra allowlist keyword")
+    ap.add_argument("--allow-danger", action="store_true")
+    ap.add_argument("--allow-unlisted-apps", action="store_true")
+    ap.add_argument("--allow-unlisted-windows", action="store_true")
+    ap.add_argument("--continue-on-fail", action="store_true")
+    ap.add_argument("--stop-on-fail", action="store_true", help="skip remaining scripts after a failure")
+    ap.add_argument("-v", "--verbose", action="store_true", help="print runner log lines to stderr")
+    opts = ap.parse_args(argv)
+
+    policy = dict(CLI_POLICY)
+    for key in policy:
+        if getattr(opts, key):
+            policy[key] = True
+    allowlist = list(ALLOWLIST_APPS) + opts.allow
+
+    out = open(opts.out, "w", encoding="utf-8") if opts.out else sys.stdout
+    out_lock = threading.Lock()
+    runner = PlanRunner(allowlist)
+    all_ok = True
+    hooks: Optional[CliHooks] = None
+    try:
+        for name, text in iter_scripts(opts.scripts, opts.pattern):
+            hooks = CliHooks(name, policy, allowlist, out, out_lock, opts.verbose)
+            runner.submit(compile_text(text, on_error=hooks.skipped_line), hooks)
+            while not hooks.done.wait(0.2):
+                pass
+            all_ok = all_ok and hooks.ok
+            if not hooks.ok and opts.stop_on_fail:
+                break
+    except KeyboardInterrupt:
+        runner.cancel()
+        all_ok = False
+        if hooks is not None:
+            # Let the cancelled job write its final record before closing out
+            hooks.done.wait(5)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,14 +30,147 @@ HOTKEY_EXIT = "<f10>"
 
 # OCR
 TESSERACT_CMD = ""
+# Folder with *.traineddata; empty = next to TESSERACT_CMD or TESSDATA_PREFIX
+TESSDATA_DIR = ""
+OCR_LANG = "eng"
+# "auto" uses the tesserocr worker pool when installed, else pytesseract;
+# "pool" or "pytesseract" forces one engine
+OCR_ENGINE = "auto"
+OCR_POOL_SIZE = 2
+# Tile-parallel OCR: preprocessed frames taller than OCR_TILE_HEIGHT pixels
+# are cut into full-width bands (at blank rows where possible) overlapping
+# by OCR_TILE_OVERLAP, and read in OCR_TILE_WORKERS processes (0 = one pass)
+OCR_TILE_WORKERS = 0
+OCR_TILE_HEIGHT = 600
+OCR_TILE_OVERLAP = 40
 
 # Safety
 FAILSAFE = True
 DEFAULT_PAUSE = 0.15
 
+# Pacing: "settle" follows input steps (skipped when the next step waits
+# for the screen anyway), "gap" follows every step
+PACING_PROFILES = {
+    "fast": {"settle": 0.02, "gap": 0.0},
+    "default": {"settle": DEFAULT_PAUSE, "gap": 0.05},
+    "slow-app": {"settle": 0.4, "gap": 0.2},
+}
+PACING_DEFAULT = "default"
+# Overrides, most specific first: action type, then window title keyword,
+# then a "pacing" step in the plan, then PACING_DEFAULT
+PACING_BY_ACTION = {}
+PACING_BY_WINDOW = {}
+
 # If True, block actions when active window title is not in allowlist
 ENFORCE_ALLOWLIST = True
 
 # Retry defaults for vision actions
 LOCATE_TIMEOUT = 6.0
 LOCATE_INTERVAL = 0.5
+
+# Screen frames are shared between vision calls for this many seconds
+FRAME_TTL = 0.3
+
+# Screen capture: "auto" uses mss when installed (grabs are converted to
+# gray in one pass, without a PIL image), else pyautogui; "mss" or
+# "pyautogui" forces one
+CAPTURE_BACKEND = "auto"
+# Area a frame covers: "monitor" (CAPTURE_MONITOR in mss numbering, 1 = first
+# monitor, 0 = all of them; pyautogui always grabs the primary one) or
+# "window" (the active window's rect, else the monitor)
+CAPTURE_SCOPE = "monitor"
+CAPTURE_MONITOR = 1
+
+# OCR word tables kept for unchanged screens (0 disables the cache)
+OCR_CACHE_SIZE = 8
+
+# Template matching for locate_image
+IMAGE_CONFIDENCE = 0.85
+# Template scale factors tried in order (covers DPI scaling changes)
+TEMPLATE_SCALES = [1.0, 1.25, 1.5, 0.8]
+
+# Change-driven waiting: thumbnails are sampled from WAIT_MIN_INTERVAL,
+# backing off by WAIT_BACKOFF up to the action's interval while the screen
+# is static; the matcher reruns on change or every WAIT_RECHECK seconds.
+WAIT_MIN_INTERVAL = 0.05
+WAIT_BACKOFF = 1.5
+WAIT_RECHECK = 2.0
+# Gray-level difference of a thumbnail cell that counts as a change
+WAIT_PIXEL_DELTA = 12
+
+# Start OCR / template loading for the next locate step while earlier
+# steps are still running (results are used only if the screen is unchanged)
+PREFETCH_VISION = True
+
+# Compiled plans kept for re-running the same script text
+PLAN_CACHE_SIZE = 16
+
+# Active window title/rect are re-read on focus change or after this long
+WINDOW_CACHE_TTL = 0.25
+
+# Text entry for "type" steps: "auto" picks between "paste" (the whole
+# text in one clipboard round-trip via TYPE_PASTE_KEYS, clipboard restored
+# afterwards), "batch" (key events without delay) and "char"
+# (per-character with a delay). Dangerous steps are never pasted.
+TYPE_MODE = "auto"
+# Window title keyword -> mode, for apps that drop fast or pasted input
+TYPE_MODE_BY_WINDOW = {}
+# Typed text is sent in chunks of this size (cancel is checked between them)
+TYPE_CHUNK_SIZE = 2000
+# In auto mode, text at least this long (or non-ASCII) is pasted
+TYPE_PASTE_MIN = 64
+TYPE_PASTE_KEYS = ["ctrl", "v"]
+# Least time the pasted text stays on the clipboard before it is restored
+# (the pacing profile's settle time is used when longer)
+TYPE_PASTE_SETTLE = 0.3
+TYPE_CHAR_INTERVAL = 0.01
+
+# Timing spans as JSON Lines (exceptions are always written there)
+TRACE_ENABLED = False
+TRACE_FILE = "trace.jsonl"
+TRACE_MAX_BYTES = 5_000_000
+TRACE_BACKUPS = 3
+
+# Decisions the headless runner (cli.py) makes instead of asking
+CLI_POLICY = {
+    "allow_danger": False,
+    "allow_unlisted_apps": False,
+    "allow_unlisted_windows": False,
+    "continue_on_fail": False,
+}
+CLI_SCRIPT_PATTERN = "*.txt"
+
+# Local control server (server.py); always bound to 127.0.0.1.
+# Empty token = a random one per start. The GUI writes the token to
+# SERVER_TOKEN_FILE (owner-only) and logs only its last characters.
+SERVER_ENABLED = False
+SERVER_PORT = 8765
+SERVER_TOKEN = ""
+SERVER_TOKEN_FILE = ".server_token"
+SERVER_POLICY = dict(CLI_POLICY)
+SERVER_MAX_BODY = 1_000_000
+# Finished jobs kept for GET /jobs/<id>
+SERVER_KEEP_JOBS = 200
+
+# Remembered locate results, verified against a pixel patch before reuse
+TARGET_CACHE_ENABLED = True
+TARGET_CACHE_FILE = ".target_cache.npz"
+TARGET_CACHE_SIZE = 500
+# Half-size of the stored patch around the matched point, in pixels
+TARGET_CACHE_PATCH = 24
+# How far the patch may have moved and still count as the same target
+TARGET_CACHE_SLACK = 3
+TARGET_CACHE_MATCH = 0.97
+
+# GUI log: lines kept on screen, flush period, and the rotating file that
+# receives lines once they scroll out of the buffer
+LOG_MAX_LINES = 1000
+LOG_FLUSH_MS = 100
+LOG_SPILL_FILE = "gui_log.txt"
+LOG_SPILL_MAX_BYTES = 2_000_000
+LOG_SPILL_BACKUPS = 2
+
+# Load OpenCV/NumPy/Tesseract in the background once the window is up
+# (otherwise they load on the first vision step)
+VISION_WARMUP = True
+VISION_WARMUP_DELAY_MS = 500
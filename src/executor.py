@@ -1,117 +1,162 @@
 import subprocess
-import time
-from typing import Dict, Any, Tuple, Callable, Optional, List
-
-import pyautogui
-
-from config import DEFAULT_PAUSE, FAILSAFE, LOCATE_TIMEOUT, LOCATE_INTERVAL
-from guardrails import is_allowed_window, is_allowed_app, active_window_title
-from vision import locate_text, locate_image
-
-pyautogui.FAILSAFE = FAILSAFE
-pyautogui.PAUSE = DEFAULT_PAUSE
+import sys
+from typing import Dict, Any, Tuple, Optional, List
+
+from actions import LOCATE_ACTIONS, VISION_ACTIONS
+from backends import get_input
+from cancel import CANCEL
+from guardrails import (
+    is_allowed_window,
+    is_allowed_app,
+    active_window_title,
+    active_window_rect,
+    invalidate_window_cache,
+)
+from plan import Step, compile_step, normalize_region
+from textentry import ProgressCallback, type_text
+
+# Screen-space box as (x, y, width, height)
+Region = Tuple[int, int, int, int]
+
+# Center of the most recent successful locate_text / locate_image
+_last_match: Optional[Tuple[int, int]] = None
+
+
+def resolve_region(spec: Any) -> Optional[Region]:
+    # spec: None, [x, y, w, h], "active_window", or
+    # {"anchor": "last_match", "x": dx, "y": dy, "w": w, "h": h}
+    # where (dx, dy) is the box's top-left relative to the last match center.
+    # Compiled steps carry the normalised form from plan.normalize_region.
+    spec = normalize_region(spec)
+    if spec is None:
+        return None
+    if spec == "active_window":
+        rect = active_window_rect()
+        if not rect:
+            raise ValueError("cannot detect active window rectangle")
+        return rect
+    kind, x, y, w, h = spec
+    if kind == "anchor":
+        if _last_match is None:
+            raise ValueError("no earlier match to anchor region to")
+        return _last_match[0] + x, _last_match[1] + y, w, h
+    return x, y, w, h
+
+
+def _remember_match(pos: Tuple[int, int]) -> None:
+    global _last_match
+    _last_match = (int(pos[0]), int(pos[1]))
 
 
 def _start_app(app: str) -> None:
     subprocess.Popen(["cmd", "/c", "start", "", app], shell=False)
 
 
-def _retry_until(
-    fn: Callable[[], Optional[Tuple[int, int]]],
-    timeout_s: float,
-    interval_s: float,
-    retries: int,
-) -> Tuple[Optional[Tuple[int, int]], str]:
-    if timeout_s > 0:
-        end = time.time() + timeout_s
-        while time.time() < end:
-            pos = fn()
-            if pos:
-                return pos, ""
-            time.sleep(interval_s)
-        return None, f"not found within {timeout_s:.1f}s"
-
-    attempts = max(0, retries)
-    for i in range(attempts + 1):
-        pos = fn()
-        if pos:
-            return pos, ""
-        if i < attempts:
-            time.sleep(interval_s)
-    return None, f"not found after {attempts + 1} attempts"
+# Actions after which cached screen frames and window state may be stale
+_SCREEN_CHANGING = {"open_app", "click", "type", "hotkey", "sleep", "scroll", *VISION_ACTIONS}
+
+
+def _invalidate_screen_state() -> None:
+    # No frames can be cached before the vision stack has been loaded.
+    capture = sys.modules.get("capture")
+    if capture is not None:
+        capture.invalidate_frame()
+    invalidate_window_cache()
 
 
 def execute_action(action: Dict[str, Any], allowlist: List[str]) -> Tuple[bool, str]:
-    act = action.get("action", "")
-    args = action.get("args", {})
+    return execute_step(compile_step(action), allowlist)
+
+
+def execute_step(
+    step: Step,
+    allowlist: List[str],
+    window_checked: bool = False,
+    progress: Optional[ProgressCallback] = None,
+    settle: float = 0.0,
+) -> Tuple[bool, str]:
+    # window_checked: the caller has just verified the allowlist for this
+    # step (the runner does, through its hooks), so skip the second lookup.
+    # progress(done, total) is reported by long-running steps (type).
+    # settle: the pacing profile's settle time (type keeps pasted text on
+    # the clipboard at least this long).
+    try:
+        return _execute(step, allowlist, window_checked, progress, settle)
+    finally:
+        if step.action in _SCREEN_CHANGING:
+            _invalidate_screen_state()
+
+
+def _execute(
+    step: Step,
+    allowlist: List[str],
+    window_checked: bool,
+    progress: Optional[ProgressCallback],
+    settle: float,
+) -> Tuple[bool, str]:
+    act = step.action
+    args = step.args
+    if step.error:
+        return False, step.error
 
     if act == "open_app":
-        app = str(args.get("app", "")).strip()
-        if not app:
-            return False, "missing app"
-        if not is_allowed_app(app, allowlist=allowlist):
+        app = args["app"]
+        if not window_checked and not is_allowed_app(app, allowlist=allowlist):
             return False, f"app not in allowlist: {app}"
         _start_app(app)
         return True, ""
 
-    if act in ["click", "type", "hotkey", "sleep", "scroll", "locate_text", "locate_image"]:
+    if step.window == "active" and not window_checked:
         if not is_allowed_window(allowlist=allowlist):
             title = active_window_title()
             return False, f"active window not in allowlist: {title or 'unknown'}"
 
     if act == "click":
-        x = int(args.get("x", 0))
-        y = int(args.get("y", 0))
-        pyautogui.click(x, y)
+        get_input().click(args["x"], args["y"])
         return True, ""
 
     if act == "type":
-        text = str(args.get("text", ""))
-        pyautogui.write(text, interval=0.01)
+        # Sensitive text never goes through the clipboard.
+        if not type_text(args["text"], args["mode"], allow_paste=not step.danger, progress=progress, settle=settle):
+            return False, "cancelled"
         return True, ""
 
     if act == "hotkey":
-        keys = [str(k).lower() for k in args.get("keys", [])]
-        if keys:
-            pyautogui.hotkey(*keys)
+        if args["keys"]:
+            get_input().hotkey(*args["keys"])
         return True, ""
 
     if act == "sleep":
-        seconds = float(args.get("seconds", 0))
-        time.sleep(seconds)
+        CANCEL.wait(args["seconds"])
         return True, ""
 
     if act == "scroll":
-        amount = int(args.get("amount", 0))
-        pyautogui.scroll(amount)
+        get_input().scroll(args["amount"])
         return True, ""
 
-    if act == "locate_text":
-        query = str(args.get("text", ""))
-        timeout_s = float(args.get("timeout", LOCATE_TIMEOUT))
-        interval_s = float(args.get("interval", LOCATE_INTERVAL))
-        retries = int(args.get("retries", 0))
-        pos, reason = _retry_until(lambda: locate_text(query), timeout_s, interval_s, retries)
-        if not pos:
-            return False, f"text not found: {query} ({reason})"
-        if args.get("click", True):
-            pyautogui.click(*pos)
-        else:
-            pyautogui.moveTo(*pos)
+    if act == "pacing":
+        # Applied by the plan runner; a no-op when executed on its own.
         return True, ""
 
-    if act == "locate_image":
-        path = str(args.get("path", ""))
-        timeout_s = float(args.get("timeout", LOCATE_TIMEOUT))
-        interval_s = float(args.get("interval", LOCATE_INTERVAL))
-        retries = int(args.get("retries", 0))
-        pos, reason = _retry_until(lambda: locate_image(path), timeout_s, interval_s, retries)
+    if act in VISION_ACTIONS:
+        try:
+            region = resolve_region(args["region"])
+        except ValueError as e:
+            return False, str(e)
+        # Loaded on first use, so sessions without vision steps never
+        # import OpenCV, NumPy or Tesseract.
+        import vision_steps
+
+        if act not in LOCATE_ACTIONS:
+            return vision_steps.wait(step, region)
+        pos, reason = vision_steps.locate(step, region, allowlist)
         if not pos:
-            return False, f"image not found: {path} ({reason})"
-        if args.get("click", True):
-            pyautogui.click(*pos)
+            return False, reason
+        _remember_match(pos)
+        if args["click"]:
+            get_input().click(*pos)
         else:
-            pyautogui.moveTo(*pos)
+            get_input().move_to(*pos)
         return True, ""
 
     return False, f"unknown action: {act}"
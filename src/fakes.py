@@ -0,0 +1,211 @@
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from backends import CaptureBackend, InputBackend, OcrBackend, Rect, WindowBackend, set_backends
+from ocr import DATA_KEYS
+
+# Corpus layout: frame_000.png, frame_001.png, ... with an optional
+# frame_000.json word table per frame (image_to_data layout, screen
+# coordinates) and an optional titles.txt holding one window title per line,
+# one line per frame.
+TITLES_FILE = "titles.txt"
+
+
+class Corpus:
+    # A recorded session that replays one frame at a time. Frame i is the
+    # screen as it looked after the i-th input event.
+
+    def __init__(
+        self,
+        frames: List[np.ndarray],
+        words: Optional[List[Optional[Dict[str, Any]]]] = None,
+        titles: Optional[List[str]] = None,
+    ) -> None:
+        if not frames:
+            raise ValueError("corpus has no frames")
+        self.frames = frames
+        self.words = words or [None] * len(frames)
+        self.titles = titles or [""]
+        self.index = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory: str) -> "Corpus":
+        frames = []
+        words: List[Optional[Dict[str, Any]]] = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.png"))):
+            img = cv2.imread(path)
+            if img is None:
+                raise ValueError(f"cannot read image: {path}")
+            img.setflags(write=False)
+            frames.append(img)
+            sidecar = os.path.splitext(path)[0] + ".json"
+            if os.path.exists(sidecar):
+                with open(sidecar, "r", encoding="utf-8") as f:
+                    words.append(json.load(f))
+            else:
+                words.append(None)
+        titles = None
+        titles_path = os.path.join(directory, TITLES_FILE)
+        if os.path.exists(titles_path):
+            with open(titles_path, "r", encoding="utf-8") as f:
+                titles = [line.rstrip("\n") for line in f]
+        return cls(frames, words, titles)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for i, frame in enumerate(self.frames):
+            cv2.imwrite(os.path.join(directory, f"frame_{i:03d}.png"), frame)
+            if self.words[i] is not None:
+                with open(os.path.join(directory, f"frame_{i:03d}.json"), "w", encoding="utf-8") as f:
+                    json.dump(self.words[i], f)
+        with open(os.path.join(directory, TITLES_FILE), "w", encoding="utf-8") as f:
+            f.write("\n".join(self.titles) + "\n")
+
+    def advance(self) -> None:
+        with self._lock:
+            self.index = (self.index + 1) % len(self.frames)
+
+    def rewind(self) -> None:
+        with self._lock:
+            self.index = 0
+
+    @property
+    def frame(self) -> np.ndarray:
+        return self.frames[self.index]
+
+    @property
+    def frame_words(self) -> Optional[Dict[str, Any]]:
+        return self.words[self.index]
+
+    @property
+    def title(self) -> str:
+        return self.titles[min(self.index, len(self.titles) - 1)]
+
+
+class ReplayCapture(CaptureBackend):
+    def __init__(self, corpus: Corpus) -> None:
+        self.corpus = corpus
+
+    def grab(self) -> np.ndarray:
+        return self.corpus.frame
+
+
+class CorpusOcr(OcrBackend):
+    # Serves the recorded word table of the current frame, clipped to the
+    # requested crop. Frames without one fall back to `fallback` (e.g. the
+    # real TesseractOcr) or read as blank.
+
+    tag = "corpus"
+
+    def __init__(self, corpus: Corpus, fallback: Optional[OcrBackend] = None) -> None:
+        self.corpus = corpus
+        self.fallback = fallback
+
+    def read(self, img: np.ndarray, origin: Tuple[int, int] = (0, 0)) -> Dict[str, Any]:
+        data = self.corpus.frame_words
+        if data is None:
+            if self.fallback is not None:
+                return self.fallback.read(img, origin)
+            return {k: [] for k in DATA_KEYS}
+        ox, oy = origin
+        h, w = img.shape[:2]
+        out: Dict[str, List[Any]] = {k: [] for k in data}
+        for i in range(len(data["text"])):
+            left, top = int(data["left"][i]) - ox, int(data["top"][i]) - oy
+            if left < 0 or top < 0 or left + int(data["width"][i]) > w or top + int(data["height"][i]) > h:
+                continue
+            for k in data:
+                out[k].append(data[k][i])
+            out["left"][-1] = left
+            out["top"][-1] = top
+        return out
+
+
+class ScriptedWindow(WindowBackend):
+    # Title of the current corpus frame; the handle changes with the frame
+    # so the guardrails window cache refreshes exactly when it should.
+
+    def __init__(self, corpus: Corpus, rect: Optional[Rect] = None) -> None:
+        self.corpus = corpus
+        h, w = corpus.frames[0].shape[:2]
+        self.rect = rect or (0, 0, w, h)
+
+    def foreground_handle(self) -> Optional[int]:
+        return self.corpus.index + 1
+
+    def active_window(self) -> Tuple[str, Optional[Rect]]:
+        return self.corpus.title, self.rect
+
+
+class RecordingInput(InputBackend):
+    # Records every input event as (seconds since creation, name, args);
+    # each event advances the corpus when one is attached.
+
+    def __init__(self, corpus: Optional[Corpus] = None) -> None:
+        self.corpus = corpus
+        self.events: List[Tuple[float, str, Tuple[Any, ...]]] = []
+        self.clipboard = ""
+        self._t0 = time.perf_counter()
+
+    def _record(self, name: str, *args: Any) -> None:
+        self.events.append((time.perf_counter() - self._t0, name, args))
+        if self.corpus is not None:
+            self.corpus.advance()
+
+    def click(self, x: int, y: int) -> None:
+        self._record("click", x, y)
+
+    def move_to(self, x: int, y: int) -> None:
+        self._record("move_to", x, y)
+
+    def write(self, text: str, interval: float) -> None:
+        self._record("write", text, interval)
+
+    def hotkey(self, *keys: str) -> None:
+        self._record("hotkey", *keys)
+
+    def scroll(self, amount: int) -> None:
+        self._record("scroll", amount)
+
+    def screen_size(self) -> Tuple[int, int]:
+        if self.corpus is None:
+            return 1920, 1080
+        h, w = self.corpus.frame.shape[:2]
+        return w, h
+
+    def get_clipboard(self) -> str:
+        return self.clipboard
+
+    def set_clipboard(self, text: str) -> None:
+        self.clipboard = text
+
+
+def install(corpus: Corpus, ocr_fallback: Optional[OcrBackend] = None) -> RecordingInput:
+    # Route capture, OCR, input and window queries through the corpus and
+    # drop everything cached from the previous backends.
+    from capture import invalidate_frame
+    from guardrails import invalidate_window_cache
+    from ocr import OCR_CACHE
+    from targets import TARGET_CACHE
+
+    recorder = RecordingInput(corpus)
+    set_backends(
+        capture=ReplayCapture(corpus),
+        ocr=CorpusOcr(corpus, ocr_fallback),
+        input_backend=recorder,
+        window=ScriptedWindow(corpus),
+    )
+    invalidate_frame()
+    invalidate_window_cache()
+    OCR_CACHE.clear()
+    # Memory only, so runs never read or write the real .target_cache.npz
+    TARGET_CACHE.reset()
+    return recorder
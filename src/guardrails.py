@@ -1,8 +1,13 @@
-from typing import Dict, Any, Optional, List
+import functools
+import re
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
 
-import pygetwindow as gw
-
-from config import ALLOWLIST_APPS, DANGEROUS_KEYWORDS, ENFORCE_ALLOWLIST
+from actions import VISION_ACTIONS
+from backends import get_window
+from config import ALLOWLIST_APPS, DANGEROUS_KEYWORDS, ENFORCE_ALLOWLIST, WINDOW_CACHE_TTL
+from tracing import span
 
 
 SENSITIVE_KEYWORDS = [
@@ -15,30 +20,97 @@ SENSITIVE_KEYWORDS = [
 ]
 
 
+class _KeywordMatcher:
+    # All keywords folded into one alternation, longest first, so a single
+    # regex scan answers "does any keyword occur in this text".
+
+    def __init__(self, keywords: Tuple[str, ...]) -> None:
+        words = sorted({k.lower() for k in keywords}, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(w) for w in words)) if words else None
+
+    def search(self, text: str) -> Optional[str]:
+        if self.pattern is None:
+            return None
+        m = self.pattern.search(text.lower())
+        return m.group(0) if m else None
+
+
+@functools.lru_cache(maxsize=16)
+def _matcher(keywords: Tuple[str, ...]) -> _KeywordMatcher:
+    return _KeywordMatcher(keywords)
+
+
+_DANGEROUS = _KeywordMatcher(tuple(DANGEROUS_KEYWORDS))
+_SENSITIVE = _KeywordMatcher(tuple(SENSITIVE_KEYWORDS))
+
+
+class _WindowCache:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.valid = False
+        self.handle = None
+        self.title = ""
+        self.rect: Optional[Tuple[int, int, int, int]] = None
+        self.taken_at = 0.0
+
+
+_window = _WindowCache()
+
+
+def _foreground_handle() -> Optional[int]:
+    # Cheap focus probe; the window backend is only asked for the title
+    # again when it changes.
+    return get_window().foreground_handle()
+
+
+def _refresh_window() -> None:
+    with span("window"):
+        _window.title, _window.rect = get_window().active_window()
+
+
+def _active_window() -> Tuple[str, Optional[Tuple[int, int, int, int]]]:
+    with _window.lock:
+        handle = _foreground_handle()
+        now = time.time()
+        if not _window.valid or handle != _window.handle or now - _window.taken_at > WINDOW_CACHE_TTL:
+            _refresh_window()
+            _window.handle = handle
+            _window.taken_at = now
+            _window.valid = True
+        return _window.title, _window.rect
+
+
+def invalidate_window_cache() -> None:
+    with _window.lock:
+        _window.valid = False
+
+
 def active_window_title() -> str:
-    try:
-        win = gw.getActiveWindow()
-        return win.title if win and win.title else ""
-    except Exception:
-        return ""
+    return _active_window()[0]
+
+
+def active_window_rect() -> Optional[Tuple[int, int, int, int]]:
+    return _active_window()[1]
+
+
+def allowed_keyword(text: str, allowlist: Optional[List[str]] = None) -> Optional[str]:
+    apps = allowlist if allowlist is not None else ALLOWLIST_APPS
+    return _matcher(tuple(apps)).search(text)
 
 
 def is_allowed_window(allowlist: Optional[List[str]] = None) -> bool:
     if not ENFORCE_ALLOWLIST:
         return True
-    title = active_window_title().lower()
+    title = active_window_title()
     if not title:
         return False
-    apps = allowlist if allowlist is not None else ALLOWLIST_APPS
-    return any(a.lower() in title for a in apps)
+    return allowed_keyword(title, allowlist) is not None
 
 
 def is_allowed_app(app_name: str, allowlist: Optional[List[str]] = None) -> bool:
     if not ENFORCE_ALLOWLIST:
         return True
-    app = app_name.lower()
-    apps = allowlist if allowlist is not None else ALLOWLIST_APPS
-    return any(a.lower() in app for a in apps)
+    return allowed_keyword(app_name, allowlist) is not None
 
 
 def danger_reason(action: Dict[str, Any]) -> Optional[str]:
@@ -47,15 +119,13 @@ def danger_reason(action: Dict[str, Any]) -> Optional[str]:
 
     if act == "open_app":
         app = str(args.get("app", "")).lower()
-        for k in DANGEROUS_KEYWORDS:
-            if k in app:
-                return f"Opening dangerous app: {app}"
+        if _DANGEROUS.search(app):
+            return f"Opening dangerous app: {app}"
 
     if act == "type":
-        text = str(args.get("text", "")).lower()
-        for k in SENSITIVE_KEYWORDS:
-            if k in text:
-                return "Typing sensitive data"
+        text = str(args.get("text", ""))
+        if _SENSITIVE.search(text):
+            return "Typing sensitive data"
 
     if act == "hotkey":
         keys = [str(k).lower() for k in args.get("keys", [])]
@@ -67,4 +137,4 @@ def danger_reason(action: Dict[str, Any]) -> Optional[str]:
 
 def needs_active_window(action: Dict[str, Any]) -> bool:
     act = action.get("action", "")
-    return act in ["click", "type", "hotkey", "sleep", "scroll", "locate_text", "locate_image"]
+    return act in ("click", "type", "hotkey", "sleep", "scroll") or act in VISION_ACTIONS
@@ -0,0 +1,81 @@
+import logging
+import logging.handlers
+import queue
+import time
+from collections import deque
+from typing import List, Optional
+
+from config import LOG_MAX_LINES, LOG_SPILL_BACKUPS, LOG_SPILL_FILE, LOG_SPILL_MAX_BYTES
+
+
+class LogBuffer:
+    # Log lines from any thread go into a queue; the UI thread drains it
+    # in batches into a fixed-size ring. Lines pushed out of the ring (and
+    # whatever is left at close) are appended to a rotating file.
+
+    def __init__(
+        self,
+        max_lines: int = LOG_MAX_LINES,
+        spill_path: str = LOG_SPILL_FILE,
+        max_bytes: int = LOG_SPILL_MAX_BYTES,
+        backups: int = LOG_SPILL_BACKUPS,
+    ) -> None:
+        self.max_lines = max_lines
+        self._queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._ring: "deque[str]" = deque()
+        self._spill_path = spill_path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._spill: Optional[logging.Logger] = None
+
+    def put(self, text: str) -> None:
+        self._queue.put(f"{time.strftime('%Y-%m-%d %H:%M:%S')}\t{text}")
+
+    def drain(self) -> List[str]:
+        # New lines since the last drain (without timestamps), oldest first.
+        new = []
+        while True:
+            try:
+                new.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not new:
+            return []
+        self._ring.extend(new)
+        overflow = len(self._ring) - self.max_lines
+        if overflow > 0:
+            self._write_spill([self._ring.popleft() for _ in range(overflow)])
+        return [line.split("\t", 1)[1] for line in new[-self.max_lines:]]
+
+    def lines(self) -> List[str]:
+        return [line.split("\t", 1)[1] for line in self._ring]
+
+    def close(self) -> None:
+        self.drain()
+        self._write_spill(list(self._ring))
+        self._ring.clear()
+
+    def _get_spill(self) -> logging.Logger:
+        if self._spill is None:
+            logger = logging.getLogger("gpt_control.gui_log")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            handler = logging.handlers.RotatingFileHandler(
+                self._spill_path,
+                maxBytes=self._max_bytes,
+                backupCount=self._backups,
+                encoding="utf-8",
+                delay=True,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            self._spill = logger
+        return self._spill
+
+    def _write_spill(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        try:
+            self._get_spill().info("\n".join(lines))
+        except Exception:
+            pass
@@ -1,38 +1,57 @@
+import itertools
+import os
 import time
+
+# Taken before the imports below so time-to-ready includes them
+_STARTED = time.perf_counter()
+
 import threading
 import tkinter as tk
 import traceback
 from tkinter import messagebox
+from typing import Optional
 
 from pynput import keyboard
-import pyperclip
-import pyautogui
 
 from agent import parse_actions
+from backends import get_input
 from guardrails import (
-    danger_reason,
-    needs_active_window,
     is_allowed_window,
     is_allowed_app,
     active_window_title,
 )
-from executor import execute_action
-from vision import locate_text, locate_image
-from config import HOTKEY_RUN_CLIPBOARD, HOTKEY_EXIT, ALLOWLIST_APPS, ENFORCE_ALLOWLIST
+from executor import resolve_region
+from logbuffer import LogBuffer
+from plan import Resolution, Step, compile_step, compile_text
+from runner import Job, PlanRunner, RunHooks
+from server import ControlServer
+import tracing
+from config import (
+    HOTKEY_RUN_CLIPBOARD,
+    HOTKEY_EXIT,
+    ALLOWLIST_APPS,
+    ENFORCE_ALLOWLIST,
+    LOG_FLUSH_MS,
+    SERVER_ENABLED,
+    SERVER_TOKEN_FILE,
+    TRACE_FILE,
+    VISION_WARMUP,
+    VISION_WARMUP_DELAY_MS,
+)
 
 
 running = True
 
+# Candidates drawn on the step-preview overlay
+PREVIEW_CANDIDATES = 5
+
 
 def _log_exception(err: Exception) -> None:
-    try:
-        with open("app.log", "a", encoding="utf-8") as f:
-            f.write("\n---\n")
-            f.write(time.strftime("%Y-%m-%d %H:%M:%S"))
-            f.write("\n")
-            f.write("".join(traceback.format_exception(type(err), err, err.__traceback__)))
-    except Exception:
-        pass
+    tracing.event(
+        "exception",
+        error=repr(err),
+        traceback="".join(traceback.format_exception(type(err), err, err.__traceback__)),
+    )
 
 
 class UiApp:
@@ -58,14 +77,79 @@ class UiApp:
         tk.Button(btn_frame, text="Clear", command=self.clear_input).pack(side="left", padx=4)
         tk.Button(btn_frame, text="Exit", command=self.exit_app).pack(side="right", padx=4)
 
+        run_frame = tk.Frame(self.root)
+        run_frame.pack(fill="x", padx=10, pady=(8, 0))
+        self.status = tk.StringVar(value="Idle")
+        tk.Label(run_frame, textvariable=self.status, anchor="w").pack(side="left", fill="x", expand=True)
+        tk.Button(run_frame, text="Cancel", command=self.cancel_run).pack(side="right", padx=4)
+        self.pause_btn = tk.Button(run_frame, text="Pause", command=self.toggle_pause)
+        self.pause_btn.pack(side="right", padx=4)
+
         self.log = tk.Text(self.root, height=12, wrap="word", state="disabled")
         self.log.pack(fill="both", expand=True, padx=10, pady=8)
+        self.log_buffer = LogBuffer()
+        self.root.after(LOG_FLUSH_MS, self._flush_log)
+
+        self.runner = PlanRunner(self.allowlist)
+
+    def call_in_ui(self, fn, *args):
+        # Run fn on the Tk thread and wait for its result.
+        if threading.current_thread() is threading.main_thread():
+            return fn(*args)
+        done = threading.Event()
+        box = {}
+
+        def _call():
+            try:
+                box["value"] = fn(*args)
+            except Exception as e:
+                box["error"] = e
+            finally:
+                done.set()
+
+        self.root.after(0, _call)
+        done.wait()
+        if "error" in box:
+            raise box["error"]
+        return box.get("value")
 
     def log_line(self, text: str) -> None:
-        self.log.configure(state="normal")
-        self.log.insert("end", text + "\n")
-        self.log.see("end")
-        self.log.configure(state="disabled")
+        # Safe from any thread; the widget is updated by _flush_log.
+        self.log_buffer.put(text)
+
+    def _flush_log(self) -> None:
+        lines = self.log_buffer.drain()
+        if lines:
+            self.log.configure(state="normal")
+            self.log.insert("end", "\n".join(lines) + "\n")
+            excess = int(self.log.index("end-1c").split(".")[0]) - 1 - self.log_buffer.max_lines
+            if excess > 0:
+                self.log.delete("1.0", f"{excess + 1}.0")
+            self.log.see("end")
+            self.log.configure(state="disabled")
+        self.root.after(LOG_FLUSH_MS, self._flush_log)
+
+    def report_ready(self) -> None:
+        ready = time.perf_counter() - _STARTED
+        self.log_line(f"[startup] ready in {ready:.2f}s")
+        tracing.event("startup", ready_s=round(ready, 3))
+        if VISION_WARMUP:
+            self.root.after(VISION_WARMUP_DELAY_MS, self._start_vision_warmup)
+
+    def _start_vision_warmup(self) -> None:
+        threading.Thread(target=self._warm_vision, name="vision-warmup", daemon=True).start()
+
+    def _warm_vision(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            import vision_steps
+
+            vision_steps.warm_up()
+        except Exception as e:
+            _log_exception(e)
+            self.log_line(f"[warn] vision warm-up failed: {e}")
+            return
+        self.log_line(f"[startup] vision stack loaded in {time.perf_counter() - t0:.2f}s")
 
     def clear_input(self) -> None:
         self.input.delete("1.0", "end")
@@ -73,8 +157,30 @@ class UiApp:
     def exit_app(self) -> None:
         global running
         running = False
+        self.runner.cancel()
+        self.log_buffer.close()
         self.root.destroy()
 
+    def set_status(self, text: str) -> None:
+        self.status.set(text)
+
+    def toggle_pause(self) -> None:
+        if self.runner.paused:
+            self.runner.resume()
+            self.pause_btn.configure(text="Pause")
+            self.log_line("[run] resumed")
+        else:
+            self.runner.pause()
+            self.pause_btn.configure(text="Resume")
+            self.log_line("[run] paused (after current step)")
+
+    def cancel_run(self) -> None:
+        if not self.runner.busy():
+            return
+        self.runner.cancel()
+        self.pause_btn.configure(text="Pause")
+        self.log_line("[run] cancel requested")
+
     def run_from_text(self) -> None:
         text = self.input.get("1.0", "end").strip()
         self._run_actions(text)
@@ -84,7 +190,7 @@ class UiApp:
         self._run_raw(text)
 
     def run_from_clipboard(self) -> None:
-        text = pyperclip.paste() or ""
+        text = get_input().get_clipboard()
         self._run_actions(text)
 
     def _suggest_allow_keyword(self, title: str) -> str:
@@ -138,36 +244,25 @@ class UiApp:
         if not text.strip():
             self.log_line("[info] empty input")
             return
-        actions = parse_actions(text)
-        if not actions:
-            self.log_line("[warn] no actions parsed; use Run Raw Text to paste as-is")
-            return
-        if not self._confirm_preview(actions=actions):
+        if self.preview_only.get():
+            actions = parse_actions(text)
+            if not actions:
+                self.log_line("[warn] no actions parsed; use Run Raw Text to paste as-is")
+                return
+            self._confirm_preview(actions=actions)
             self.log_line("[info] preview only or user cancelled")
             return
-        for action in actions:
-            if not self._step_confirm(action):
-                self.log_line("[info] step-by-step cancelled")
-                break
-            reason = danger_reason(action)
-            if reason and not self._confirm_danger(reason):
-                self.log_line("[blocked] user rejected dangerous action")
-                continue
-            if action.get("action") == "open_app":
-                app = str(action.get("args", {}).get("app", ""))
-                if not self._ensure_allowlist_for_app(app):
-                    self.log_line("[blocked] app not in allowlist")
-                    continue
-            elif needs_active_window(action):
-                if not self._ensure_allowlist_for_active_window():
-                    self.log_line("[blocked] active window not in allowlist")
-                    continue
-            ok, msg = execute_action(action, self.allowlist)
-            if not ok:
-                self.log_line(f"[warn] action failed: {msg}")
-                if not self._confirm_continue_after_fail(msg):
-                    break
-            time.sleep(0.05)
+        # The rest of the script is parsed and compiled on the runner thread
+        # as it executes; re-running the same text reuses the compiled plan.
+        stream = compile_text(text, on_error=self._log_skipped_line)
+        first = next(stream, None)
+        if first is None:
+            self.log_line("[warn] no actions parsed; use Run Raw Text to paste as-is")
+            return
+        self._submit(itertools.chain([first], stream))
+
+    def _log_skipped_line(self, lineno: int, line: str) -> None:
+        self.log_line(f"[warn] line {lineno} not parsed: {line[:80]}")
 
     def _run_raw(self, text: str) -> None:
         if not text.strip():
@@ -176,21 +271,13 @@ class UiApp:
         if not self._confirm_preview(raw_text=text):
             self.log_line("[info] preview only or user cancelled")
             return
-        action = {"action": "type", "args": {"text": text}}
-        if not self._step_confirm(action):
-            self.log_line("[info] step-by-step cancelled")
-            return
-        reason = danger_reason(action)
-        if reason and not self._confirm_danger(reason):
-            self.log_line("[blocked] user rejected dangerous action")
-            return
-        if needs_active_window(action):
-            if not self._ensure_allowlist_for_active_window():
-                self.log_line("[blocked] active window not in allowlist")
-                return
-        ok, msg = execute_action(action, self.allowlist)
-        if not ok:
-            self.log_line(f"[warn] action failed: {msg}")
+        self._submit([compile_step({"action": "type", "args": {"text": text}})])
+
+    def _submit(self, steps) -> None:
+        busy = self.runner.busy()
+        job = self.runner.submit(steps, _UiHooks(self))
+        if busy:
+            self.log_line(f"[run] job {job.id} queued")
 
     def _confirm_preview(self, actions=None, raw_text: str | None = None) -> bool:
         preview_lines = []
@@ -249,40 +336,88 @@ class UiApp:
         self.root.wait_window(dlg)
         return result["run"]
 
-    def _step_confirm(self, action: dict) -> bool:
-        act = action.get("action", "")
-        args = action.get("args", {})
-        pos = None
-        if act == "click":
-            try:
-                pos = (int(args.get("x", 0)), int(args.get("y", 0)))
-            except Exception:
-                pos = None
-        elif act == "locate_text":
-            query = str(args.get("text", ""))
-            pos = locate_text(query)
-            if not pos:
-                messagebox.showwarning("Step Preview", f"Text not found: {query}")
-                return False
-        elif act == "locate_image":
-            path = str(args.get("path", ""))
-            pos = locate_image(path)
-            if not pos:
-                messagebox.showwarning("Step Preview", f"Image not found: {path}")
-                return False
-
+    def _preview_locate(self, fn, step: Step):
+        try:
+            return fn(resolve_region(step.args["region"]))
+        except ValueError as e:
+            self.log_line(f"[warn] {e}")
+            return None
+
+    def _preview_candidates(self, step: Step):
+        # [(x, y, score, label)] best first, or None if the lookup failed.
+        from vision import locate_texts, locate_image_match, locate_any_image
+
+        act = step.action
+        args = step.args
+        if act == "locate_text":
+            query = args["text"]
+            found = self._preview_locate(lambda region: locate_texts([query], region, limit=PREVIEW_CANDIDATES), step)
+            return [(m.x, m.y, m.score, m.text) for m in (found or {}).get(query, [])]
+        if act == "locate_texts":
+            from vision_steps import first_found
+
+            queries = list(args["texts"])
+            found = self._preview_locate(lambda region: locate_texts(queries, region, limit=PREVIEW_CANDIDATES), step)
+            found = {q: (found or {}).get(q, []) for q in queries}
+            # Same rule as the executor: in "all" mode every query must match
+            if first_found(found, queries, args["mode"] == "all") is None:
+                return []
+            return [(m.x, m.y, m.score, m.text) for q in queries for m in found[q]]
+        if act == "locate_image":
+            path = args["path"]
+            m = self._preview_locate(lambda region: locate_image_match(path, region), step)
+            return [(m.x, m.y, m.score, f"x{m.scale:g}")] if m else []
+        if act == "locate_any_image":
+            directory = args["dir"]
+            threshold = args["threshold"]
+            hits = self._preview_locate(lambda region: locate_any_image(directory, region, threshold), step)
+            return [(h.x, h.y, h.score, h.name) for h in (hits or [])[:PREVIEW_CANDIDATES]]
+        return None
+
+    def _preview_target(self, step: Step):
+        # Vision lookups for the step preview; runs on the runner thread.
+        # Returns (Resolution or None, warning or None). For click steps the
+        # Resolution only carries the point to draw.
+        if step.error:
+            return None, None
+        if step.action == "click":
+            return Resolution(step.args["x"], step.args["y"], 1.0, "", ""), None
+        candidates = self._preview_candidates(step)
+        if candidates is None:
+            return None, None
+        if not candidates:
+            return None, f"Target not found: {step.action} {dict(step.args)}"
+        from capture import frame_fingerprint
+        from vision import last_searched
+
+        # Fingerprint of the very pixels the candidates were found in; the
+        # executor reuses the match only while the screen still hashes the same
+        searched = last_searched()
+        fingerprint = frame_fingerprint(searched[0]) if searched is not None else ""
+        x, y, score, label = candidates[0]
+        return Resolution(x, y, score, label, fingerprint, tuple(candidates[1:])), None
+
+    def _ask_step(self, step: Step, res, warning) -> bool:
+        if warning:
+            messagebox.showwarning("Step Preview", warning)
+            return False
         overlay = None
-        if pos:
-            overlay = self._show_overlay(*pos)
-
-        msg = f"Next step:\n- {act} {args}\n\nRun this step?"
+        match = ""
+        if res:
+            overlay = self._show_overlay(res)
+            if res.fingerprint:
+                match = f"\nMatch: {res.label!r} score {res.score:.2f}"
+                if res.alternatives:
+                    match += f" (+{len(res.alternatives)} other candidates)"
+
+        msg = f"Next step:\n- {step.action} {dict(step.args)}{match}\n\nRun this step?"
         ok = messagebox.askyesno("Step Preview", msg)
         if overlay:
             overlay.destroy()
         return ok
 
-    def _show_overlay(self, x: int, y: int) -> tk.Toplevel:
-        w, h = pyautogui.size()
+    def _show_overlay(self, res: Resolution) -> tk.Toplevel:
+        w, h = get_input().screen_size()
         ov = tk.Toplevel(self.root)
         ov.overrideredirect(True)
         ov.attributes("-topmost", True)
@@ -293,20 +428,68 @@ class UiApp:
         canvas.pack(fill="both", expand=True)
 
         r = 18
+        for ax, ay, score, label in res.alternatives:
+            canvas.create_oval(ax - r, ay - r, ax + r, ay + r, outline="orange", width=2)
+            canvas.create_text(ax + r + 4, ay, text=f"{label} {score:.2f}", fill="orange", anchor="w")
+        x, y = res.x, res.y
         canvas.create_oval(x - r, y - r, x + r, y + r, outline="red", width=4)
         canvas.create_line(x - 40, y, x + 40, y, fill="red", width=2)
         canvas.create_line(x, y - 40, x, y + 40, fill="red", width=2)
+        if res.fingerprint:
+            canvas.create_text(x + 44, y - 12, text=f"{res.label} {res.score:.2f}", fill="red", anchor="w")
         return ov
 
 
+class _UiHooks(RunHooks):
+    # Runs on the runner thread; dialogs are marshalled to the Tk thread.
+
+    def __init__(self, ui: UiApp) -> None:
+        self.ui = ui
+
+    def log(self, text: str) -> None:
+        self.ui.log_line(text)
+
+    def progress(self, index: int, total, step: Step) -> None:
+        counter = f"{index}/{total}" if total is not None else f"{index}"
+        self.ui.root.after(0, self.ui.set_status, f"Step {counter}: {step.action}")
+
+    def step_progress(self, index: int, done: int, total: int) -> None:
+        pct = 100 * done // max(1, total)
+        self.ui.root.after(0, self.ui.set_status, f"Step {index + 1}: {done}/{total} chars ({pct}%)")
+
+    def step_preview(self, step: Step) -> Optional[Step]:
+        res, warning = self.ui._preview_target(step)
+        if not self.ui.call_in_ui(self.ui._ask_step, step, res, warning):
+            return None
+        # The executor reuses the match if the screen is still the same.
+        return step.with_resolution(res) if res and res.fingerprint else step
+
+    def confirm_danger(self, reason: str) -> bool:
+        return self.ui.call_in_ui(self.ui._confirm_danger, reason)
+
+    def ensure_app_allowed(self, app: str) -> bool:
+        return self.ui.call_in_ui(self.ui._ensure_allowlist_for_app, app)
+
+    def ensure_window_allowed(self) -> bool:
+        return self.ui.call_in_ui(self.ui._ensure_allowlist_for_active_window)
+
+    def continue_after_fail(self, reason: str) -> bool:
+        return self.ui.call_in_ui(self.ui._confirm_continue_after_fail, reason)
+
+    def finished(self, job: Job) -> None:
+        if job.state != "done":
+            self.ui.log_line(f"[run] job {job.id} {job.state}")
+        self.ui.root.after(0, self.ui.set_status, "Idle" if not self.ui.runner.busy() else "Queued")
+
+
 def on_activate_run(ui: UiApp):
     ui.log_line("[hotkey] run from clipboard")
-    ui.run_from_clipboard()
+    ui.root.after(0, ui.run_from_clipboard)
 
 
 def on_activate_exit(ui: UiApp):
     ui.log_line("[hotkey] exit")
-    ui.exit_app()
+    ui.root.after(0, ui.exit_app)
     return False
 
 
@@ -330,6 +513,21 @@ def main():
 
     t = threading.Thread(target=_hotkey_thread, args=(ui,), daemon=True)
     t.start()
+    if SERVER_ENABLED:
+        try:
+            server = ControlServer(ui.runner, ui.allowlist, log=ui.log_line)
+        except OSError as e:
+            ui.log_line(f"[warn] control server not started: {e}")
+        else:
+            server.start()
+            # The log is spilled to disk, so it never holds the full token
+            try:
+                server.save_token()
+                where = f"in {os.path.abspath(SERVER_TOKEN_FILE)}"
+            except OSError as e:
+                where = f"not saved ({e})"
+            ui.log_line(f"Control server: {server.url} | token {server.masked_token} {where}")
+    ui.root.after(0, ui.report_ready)
     ui.root.mainloop()
 
 
@@ -339,7 +537,7 @@ if __name__ == "__main__":
     except Exception as e:
         _log_exception(e)
         try:
-            messagebox.showerror("GPT Control Error", f"{e}\n\nChi ti?t trong app.log")
+            messagebox.showerror("GPT Control Error", f"{e}\n\nChi ti?t trong {TRACE_FILE}")
         except Exception:
             pass
         time.sleep(2)
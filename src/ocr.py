@@ -0,0 +1,365 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import pytesseract
+import numpy as np
+
+from config import (
+    TESSERACT_CMD,
+    TESSDATA_DIR,
+    OCR_CACHE_SIZE,
+    OCR_ENGINE,
+    OCR_POOL_SIZE,
+    OCR_LANG,
+    OCR_TILE_HEIGHT,
+    OCR_TILE_OVERLAP,
+    OCR_TILE_WORKERS,
+)
+from tracing import span
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+TESSERACT_CONFIG = "--oem 3 --psm 6"
+
+DATA_KEYS = (
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text",
+)
+
+
+def _set_tesseract_cmd() -> None:
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+
+def _tessdata_dir() -> Optional[str]:
+    if TESSDATA_DIR:
+        return TESSDATA_DIR
+    if TESSERACT_CMD:
+        guess = os.path.join(os.path.dirname(TESSERACT_CMD), "tessdata")
+        if os.path.isdir(guess):
+            return guess
+    return None
+
+
+def image_to_data_pytesseract(proc: np.ndarray) -> Dict[str, Any]:
+    _set_tesseract_cmd()
+    return pytesseract.image_to_data(
+        proc,
+        output_type=pytesseract.Output.DICT,
+        config=TESSERACT_CONFIG,
+        lang=OCR_LANG,
+    )
+
+
+class TesseractPool:
+    # Long-lived in-process Tesseract instances (via tesserocr). Each one
+    # keeps its language model loaded, and images are handed over as raw
+    # pixel buffers, so there is no process start or temp file per call.
+
+    def __init__(self, size: int, lang: str) -> None:
+        self.size = max(1, size)
+        self.lang = lang
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_api(self) -> Any:
+        kwargs = {"lang": self.lang, "psm": tesserocr.PSM.SINGLE_BLOCK, "oem": tesserocr.OEM.DEFAULT}
+        path = _tessdata_dir()
+        if path:
+            kwargs["path"] = path
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _acquire(self) -> Any:
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                try:
+                    return self._new_api()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get()
+
+    def warm(self) -> None:
+        self._idle.put(self._acquire())
+
+    def image_to_data(self, proc: np.ndarray) -> Dict[str, Any]:
+        img = np.ascontiguousarray(proc)
+        if img.ndim != 2:
+            raise ValueError("TesseractPool expects a single-channel image")
+        api = self._acquire()
+        try:
+            api.SetImageBytes(img.tobytes(), img.shape[1], img.shape[0], 1, img.shape[1])
+            api.Recognize()
+            return _iterator_to_data(api.GetIterator())
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get().End()
+        self._created = 0
+
+
+def _iterator_to_data(it: Any) -> Dict[str, Any]:
+    # Same shape as pytesseract's Output.DICT, word rows only.
+    data: Dict[str, List[Any]] = {k: [] for k in DATA_KEYS}
+    if it is None:
+        return data
+    ril = tesserocr.RIL
+    block = par = line = word = 0
+    for r in tesserocr.iterate_level(it, ril.WORD):
+        if r.IsAtBeginningOf(ril.BLOCK):
+            block += 1
+            par = line = 0
+        if r.IsAtBeginningOf(ril.PARA):
+            par += 1
+            line = 0
+        if r.IsAtBeginningOf(ril.TEXTLINE):
+            line += 1
+            word = 0
+        word += 1
+        box = r.BoundingBox(ril.WORD)
+        if box is None:
+            continue
+        x1, y1, x2, y2 = box
+        row = {
+            "level": 5,
+            "page_num": 1,
+            "block_num": block,
+            "par_num": par,
+            "line_num": line,
+            "word_num": word,
+            "left": x1,
+            "top": y1,
+            "width": x2 - x1,
+            "height": y2 - y1,
+            "conf": r.Confidence(ril.WORD),
+            "text": r.GetUTF8Text(ril.WORD) or "",
+        }
+        for k in DATA_KEYS:
+            data[k].append(row[k])
+    return data
+
+
+_pool: Optional[TesseractPool] = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[TesseractPool]:
+    global _pool, _pool_failed
+    if OCR_ENGINE == "pytesseract" or tesserocr is None or _pool_failed:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            pool = TesseractPool(OCR_POOL_SIZE, OCR_LANG)
+            try:
+                pool.warm()
+            except Exception:
+                _pool_failed = True
+                if OCR_ENGINE == "pool":
+                    raise
+                return None
+            _pool = pool
+    return _pool
+
+
+def ocr_engine_name() -> str:
+    return "pool" if _get_pool() is not None else "pytesseract"
+
+
+def image_to_data(proc: np.ndarray) -> Dict[str, Any]:
+    pool = _get_pool()
+    if pool is not None:
+        return pool.image_to_data(proc)
+    return image_to_data_pytesseract(proc)
+
+
+class Band(NamedTuple):
+    # Rows [top, bottom) are OCR'd; words centred in [own_top, own_bottom)
+    # are kept, so the overlap with neighbouring bands is read twice but
+    # reported once.
+    top: int
+    bottom: int
+    own_top: int
+    own_bottom: int
+
+
+# Block numbers of band n start at n * _BAND_BLOCKS, keeping text lines
+# from different bands apart in the merged table
+_BAND_BLOCKS = 1000
+
+
+def tile_bands(proc: np.ndarray, height: int = OCR_TILE_HEIGHT, overlap: int = OCR_TILE_OVERLAP) -> List[Band]:
+    # Full-width bands of about `height` rows, so no text line is split
+    # sideways. Each cut moves up to the nearest blank row within a quarter
+    # band, which keeps it between text lines where the layout allows.
+    h = proc.shape[0]
+    if height <= 0 or h <= height + overlap:
+        return [Band(0, h, 0, h)]
+    blank = proc.min(axis=1) == proc.max(axis=1)
+    cuts = [0]
+    while h - cuts[-1] > height + overlap:
+        cut = cuts[-1] + height
+        for row in range(cut, cut - height // 4, -1):
+            if blank[row]:
+                cut = row
+                break
+        cuts.append(cut)
+    cuts.append(h)
+    return [
+        Band(max(0, a - overlap), min(h, b + overlap), a, b)
+        for a, b in zip(cuts, cuts[1:])
+    ]
+
+
+def merge_bands(parts: List[Tuple[Band, Dict[str, Any]]]) -> Dict[str, Any]:
+    # Word rows of every band in frame coordinates, one row per word.
+    data: Dict[str, List[Any]] = {k: [] for k in DATA_KEYS}
+    for n, (band, part) in enumerate(parts):
+        for i in range(len(part["text"])):
+            if int(part["level"][i]) != 5:
+                continue
+            top = int(part["top"][i]) + band.top
+            if not band.own_top <= top + int(part["height"][i]) // 2 < band.own_bottom:
+                continue
+            for k in DATA_KEYS:
+                data[k].append(part[k][i])
+            data["top"][-1] = top
+            data["block_num"][-1] = n * _BAND_BLOCKS + int(part["block_num"][i])
+    return data
+
+
+_tiles: Dict[int, ProcessPoolExecutor] = {}
+_tiles_failed = False
+_tiles_lock = threading.Lock()
+
+
+def _get_tiles(workers: int) -> Optional[ProcessPoolExecutor]:
+    # Worker processes are started once per worker count and kept; each
+    # loads its own Tesseract engine on first use.
+    if workers <= 0 or _tiles_failed:
+        return None
+    with _tiles_lock:
+        tiles = _tiles.get(workers)
+        if tiles is None:
+            tiles = _tiles[workers] = ProcessPoolExecutor(max_workers=workers)
+    return tiles
+
+
+def _ping(_: int) -> None:
+    pass
+
+
+def warm_tiles(workers: int = OCR_TILE_WORKERS) -> None:
+    # Start the worker processes (and their imports) ahead of the first read.
+    tiles = _get_tiles(workers)
+    if tiles is not None:
+        list(tiles.map(_ping, range(workers)))
+
+
+def image_to_data_tiled(
+    proc: np.ndarray,
+    workers: int = OCR_TILE_WORKERS,
+    height: int = OCR_TILE_HEIGHT,
+    overlap: int = OCR_TILE_OVERLAP,
+) -> Dict[str, Any]:
+    # image_to_data over bands read in parallel; frames that fit one band,
+    # or workers=0, take the single pass.
+    global _tiles_failed
+    bands = tile_bands(proc, height, overlap) if workers > 0 else []
+    tiles = _get_tiles(workers) if len(bands) > 1 else None
+    if tiles is None:
+        return image_to_data(proc)
+    try:
+        parts = list(tiles.map(image_to_data, [np.ascontiguousarray(proc[b.top:b.bottom]) for b in bands]))
+    except BrokenProcessPool:
+        _tiles_failed = True
+        return image_to_data(proc)
+    return merge_bands(list(zip(bands, parts)))
+
+
+def preprocess(img: np.ndarray) -> Tuple[np.ndarray, float]:
+    # img is BGR or already gray.
+    scale = 1.0
+    h, w = img.shape[:2]
+    if max(h, w) < 1400:
+        scale = 2.0
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    blur = cv2.GaussianBlur(gray, (3, 3), 0)
+    _, th = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return th, scale
+
+
+def read_text(img: np.ndarray) -> Dict[str, Any]:
+    # Word table with boxes in the coordinates of img (BGR or gray).
+    with span("ocr.preprocess"):
+        proc, scale = preprocess(img)
+    with span("ocr.tesseract"):
+        data = image_to_data_tiled(proc)
+    if scale != 1.0:
+        for k in ("left", "top", "width", "height"):
+            data[k] = [int(v / scale) for v in data[k]]
+    return data
+
+
+class OcrCache:
+    # Values are whatever the caller builds from one OCR pass
+    # (vision stores a text_index.WordIndex).
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: Any) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
+
+
+OCR_CACHE = OcrCache(OCR_CACHE_SIZE)
+
+
+def ocr_cache_stats() -> Dict[str, int]:
+    return OCR_CACHE.stats()
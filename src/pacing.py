@@ -0,0 +1,69 @@
+import time
+from typing import Optional
+
+from actions import WAIT_ACTIONS
+from cancel import CANCEL
+from config import PACING_BY_ACTION, PACING_BY_WINDOW, PACING_DEFAULT, PACING_PROFILES
+from guardrails import active_window_title
+from plan import Step
+from tracing import span
+
+# Steps that send no input, so nothing needs to settle after them
+_NO_INPUT = ("sleep", "pacing", *WAIT_ACTIONS)
+
+
+def waits_for_screen(step: Optional[Step]) -> bool:
+    # True when the step waits for the screen to change (or text to go),
+    # so a settle delay before it only postpones the first look. Locate
+    # steps do not qualify: their first check could match the screen as
+    # it was before the input.
+    return step is not None and not step.error and step.action in WAIT_ACTIONS
+
+
+def _window_profile() -> Optional[str]:
+    if not PACING_BY_WINDOW:
+        return None
+    title = active_window_title().lower()
+    for keyword, name in PACING_BY_WINDOW.items():
+        if keyword.lower() in title:
+            return name
+    return None
+
+
+class Pacer:
+    # Delays between the steps of one run, plus the time accounting for
+    # its end-of-run report.
+
+    def __init__(self, profile: str = PACING_DEFAULT) -> None:
+        self.plan_profile = profile
+        self.slept = 0.0
+        self.worked = 0.0
+        self.sleep_steps = 0.0
+
+    def profile(self, step: Step) -> dict:
+        name = PACING_BY_ACTION.get(step.action) or _window_profile() or self.plan_profile
+        return PACING_PROFILES.get(name) or PACING_PROFILES[PACING_DEFAULT]
+
+    def record(self, step: Step, seconds: float) -> None:
+        self.worked += seconds
+        if step.action == "sleep":
+            self.sleep_steps += seconds
+
+    def after(self, step: Step, next_step: Optional[Step]) -> None:
+        prof = self.profile(step)
+        delay = prof["gap"]
+        if step.action not in _NO_INPUT and not step.error and not waits_for_screen(next_step):
+            delay += prof["settle"]
+        if delay > 0:
+            t0 = time.perf_counter()
+            with span("pacing", seconds=delay):
+                CANCEL.wait(delay)
+            self.slept += time.perf_counter() - t0
+
+    def report(self) -> str:
+        total = self.slept + self.worked
+        share = 100 * self.slept / total if total else 0.0
+        return (
+            f"[pacing] steps {self.worked:.2f}s (sleep steps {self.sleep_steps:.2f}s), "
+            f"pacing delays {self.slept:.2f}s ({share:.0f}% of {total:.2f}s)"
+        )
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from agent import ErrorCallback, iter_actions
+from config import LOCATE_TIMEOUT, LOCATE_INTERVAL, PACING_PROFILES, PLAN_CACHE_SIZE, TYPE_MODE
+from guardrails import danger_reason, needs_active_window
+
+
+class Resolution(NamedTuple):
+    # Where a locate step's target was found before it ran (by the step
+    # preview), and the fingerprint of the searched area at that moment.
+    x: int
+    y: int
+    score: float
+    label: str
+    fingerprint: str
+    # Other candidates as (x, y, score, label), best first
+    alternatives: Tuple[Tuple[int, int, float, str], ...] = ()
+
+
+class Step:
+    # One compiled, immutable plan step. args hold typed values with
+    # defaults filled in; error is set when the source step was invalid
+    # (the step then fails when it is reached, like before compilation).
+    # resolved is a preview result the executor may use instead of searching.
+
+    __slots__ = ("index", "action", "args", "danger", "window", "digest", "error", "resolved")
+
+    def __init__(
+        self,
+        index: int,
+        action: str,
+        args: Mapping[str, Any],
+        danger: Optional[str],
+        window: Optional[str],
+        digest: str,
+        error: Optional[str],
+        resolved: Optional[Resolution] = None,
+    ) -> None:
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "action", action)
+        object.__setattr__(self, "args", MappingProxyType(dict(args)))
+        object.__setattr__(self, "danger", danger)
+        object.__setattr__(self, "window", window)
+        object.__setattr__(self, "digest", digest)
+        object.__setattr__(self, "error", error)
+        object.__setattr__(self, "resolved", resolved)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Step is immutable")
+
+    def with_resolution(self, resolved: Optional[Resolution]) -> "Step":
+        return Step(self.index, self.action, self.args, self.danger, self.window, self.digest, self.error, resolved)
+
+    def __repr__(self) -> str:
+        return f"Step({self.index}, {self.action!r}, {dict(self.args)!r})"
+
+
+def _str(v: Any) -> str:
+    return str(v)
+
+
+def _keys(v: Any) -> Tuple[str, ...]:
+    return tuple(str(k).lower() for k in v)
+
+
+def _texts(v: Any) -> Tuple[str, ...]:
+    return tuple(str(t) for t in v if str(t).strip())
+
+
+def _type_mode(v: Any) -> str:
+    mode = str(v).lower()
+    if mode not in ("auto", "paste", "batch", "char"):
+        raise ValueError(mode)
+    return mode
+
+
+def _profile(v: Any) -> str:
+    name = str(v).strip().lower()
+    if name not in PACING_PROFILES:
+        raise ValueError(name)
+    return name
+
+
+def _opt_float(v: Any) -> Optional[float]:
+    return None if v is None else float(v)
+
+
+def normalize_region(v: Any) -> Any:
+    # Normalised forms: None, "active_window", ("box", x, y, w, h),
+    # ("anchor", dx, dy, w, h). See executor.resolve_region.
+    if v is None or v == "" or v == "screen":
+        return None
+    if v == "active_window":
+        return v
+    if isinstance(v, tuple) and len(v) == 5 and v[0] in ("box", "anchor"):
+        return v
+    if isinstance(v, (list, tuple)) and len(v) == 4:
+        return ("box",) + tuple(int(n) for n in v)
+    if isinstance(v, dict) and v.get("anchor") == "last_match":
+        w, h = int(v.get("w", 0)), int(v.get("h", 0))
+        if w <= 0 or h <= 0:
+            raise ValueError("anchor region needs w and h")
+        return ("anchor", int(v.get("x", 0)), int(v.get("y", 0)), w, h)
+    raise ValueError(f"invalid region: {v}")
+
+
+_LOCATE_ARGS: Dict[str, Tuple[Callable[[Any], Any], Any]] = {
+    "timeout": (float, LOCATE_TIMEOUT),
+    "interval": (float, LOCATE_INTERVAL),
+    "retries": (int, 0),
+    "click": (bool, True),
+    "region": (normalize_region, None),
+}
+
+# action -> {arg: (converter, default)}
+ARG_SPECS: Dict[str, Dict[str, Tuple[Callable[[Any], Any], Any]]] = {
+    "open_app": {"app": (lambda v: str(v).strip(), "")},
+    "click": {"x": (int, 0), "y": (int, 0)},
+    "type": {"text": (_str, ""), "mode": (_type_mode, TYPE_MODE)},
+    "hotkey": {"keys": (_keys, ())},
+    "sleep": {"seconds": (float, 0.0)},
+    "scroll": {"amount": (int, 0)},
+    "pacing": {"profile": (_profile, "")},
+    "locate_text": {"text": (_str, ""), **_LOCATE_ARGS},
+    "locate_texts": {"texts": (_texts, ()), "mode": (lambda v: str(v).lower(), "any"), **_LOCATE_ARGS},
+    "locate_image": {"path": (_str, ""), **_LOCATE_ARGS},
+    "locate_any_image": {"dir": (_str, ""), "threshold": (_opt_float, None), **_LOCATE_ARGS},
+    "wait_for_change": {
+        "timeout": (float, LOCATE_TIMEOUT),
+        "interval": (float, LOCATE_INTERVAL),
+        "region": (normalize_region, None),
+    },
+    "wait_until_text_gone": {
+        "text": (_str, ""),
+        "timeout": (float, LOCATE_TIMEOUT),
+        "interval": (float, LOCATE_INTERVAL),
+        "region": (normalize_region, None),
+    },
+}
+
+# action -> arg that must be non-empty
+_REQUIRED = {
+    "open_app": "app",
+    "pacing": "profile",
+    "locate_texts": "texts",
+    "locate_any_image": "dir",
+    "wait_until_text_gone": "text",
+}
+
+
+def _digest(action: Any) -> str:
+    raw = json.dumps(action, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def compile_step(action: Any, index: int = 0) -> Step:
+    digest = _digest(action)
+    if not isinstance(action, dict):
+        return Step(index, "", {}, None, None, digest, f"invalid step: {action!r}")
+    act = str(action.get("action", ""))
+    raw_args = action.get("args", {})
+    if not isinstance(raw_args, dict):
+        raw_args = {}
+    spec = ARG_SPECS.get(act)
+    if spec is None:
+        return Step(index, act, raw_args, None, None, digest, f"unknown action: {act}")
+
+    args: Dict[str, Any] = {}
+    error = None
+    for key, (convert, default) in spec.items():
+        value = raw_args.get(key)
+        if value is None:
+            args[key] = default
+            continue
+        try:
+            args[key] = convert(value)
+        except (TypeError, ValueError) as e:
+            args[key] = default
+            error = error or (str(e) if key == "region" else f"invalid {key}: {value!r}")
+    required = _REQUIRED.get(act)
+    if required and not args[required] and error is None:
+        error = f"missing {required}"
+
+    typed = {"action": act, "args": args}
+    if act == "open_app":
+        window = "app"
+    elif needs_active_window(typed):
+        window = "active"
+    else:
+        window = None
+    return Step(index, act, args, danger_reason(typed), window, digest, error)
+
+
+def iter_compile(actions: Iterable[Any]) -> Iterator[Step]:
+    for i, action in enumerate(actions):
+        yield compile_step(action, i)
+
+
+class _PlanCache:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._items: "OrderedDict[str, Tuple[Tuple[Step, ...], Tuple[Tuple[int, str], ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Tuple[Step, ...], Tuple[Tuple[int, str], ...]]]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def put(self, key: str, steps: List[Step], errors: List[Tuple[int, str]]) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (tuple(steps), tuple(errors))
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+PLAN_CACHE = _PlanCache(PLAN_CACHE_SIZE)
+
+
+def plan_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def compile_text(text: str, on_error: Optional[ErrorCallback] = None) -> Iterator[Step]:
+    # Cached plans are replayed as-is; otherwise the script is parsed and
+    # compiled lazily and stored once it has been read to the end.
+    key = plan_digest(text)
+    cached = PLAN_CACHE.get(key)
+    if cached is not None:
+        steps, errors = cached
+        if on_error:
+            for lineno, line in errors:
+                on_error(lineno, line)
+        yield from steps
+        return
+
+    errors: List[Tuple[int, str]] = []
+
+    def _record(lineno: int, line: str) -> None:
+        errors.append((lineno, line))
+        if on_error:
+            on_error(lineno, line)
+
+    steps: List[Step] = []
+    for step in iter_compile(iter_actions(text, on_error=_record)):
+        steps.append(step)
+        yield step
+    PLAN_CACHE.put(key, steps, errors)
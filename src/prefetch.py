@@ -0,0 +1,76 @@
+import threading
+from typing import Callable, List, Optional
+
+from actions import VISION_ACTIONS
+from config import PREFETCH_VISION
+from executor import resolve_region
+from plan import Step
+
+
+def next_vision_step(steps: List[Step], start: int) -> Optional[int]:
+    for j in range(start, len(steps)):
+        if steps[j].action in VISION_ACTIONS and not steps[j].error:
+            return j
+    return None
+
+
+class Prefetcher:
+    # One background worker, at most one task in flight. Submissions made
+    # while it is busy are dropped: the next step will submit again.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._task: Optional[Callable[[], None]] = None
+        self._busy = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="vision-prefetch", daemon=True)
+        self._thread.start()
+
+    def submit(self, task: Callable[[], None]) -> bool:
+        with self._lock:
+            if self._busy:
+                return False
+            self._busy = True
+            self._task = task
+        self._wake.set()
+        return True
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                task = self._task
+                self._task = None
+            try:
+                if task is not None:
+                    task()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._busy = False
+
+    def lookahead(self, steps: List[Step], current: int) -> None:
+        # Warm caches for the first vision step after the current one.
+        # Not while the current step is a vision step itself: it is about to
+        # read the same frame, and the prefetch would only duplicate its OCR.
+        if not PREFETCH_VISION or steps[current].action in VISION_ACTIONS:
+            return
+        j = next_vision_step(steps, current + 1)
+        if j is None:
+            return
+        step = steps[j]
+        spec = step.args["region"]
+        if spec is not None and spec[0] == "anchor":
+            # Anchored regions depend on matches that have not happened yet.
+            return
+
+        def _task() -> None:
+            # Imported here so the prefetch thread, not the runner, pays for
+            # loading the vision stack when a plan first needs it.
+            from vision import warm
+
+            warm(step.action, step.args, resolve_region(spec))
+
+        self.submit(_task)
@@ -0,0 +1,222 @@
+import itertools
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from cancel import CANCEL
+from executor import execute_step
+from pacing import Pacer
+from plan import Step
+from prefetch import Prefetcher
+import tracing
+
+# Steps parsed ahead of the current one when a plan is streamed
+LOOKAHEAD = 8
+
+
+class RunHooks:
+    # Decisions and reporting for one job. Every method is called on the
+    # runner's worker thread; UI implementations marshal to their own thread.
+
+    def log(self, text: str) -> None:
+        pass
+
+    def progress(self, index: int, total: Optional[int], step: Step) -> None:
+        pass
+
+    def step_preview(self, step: Step) -> Optional[Step]:
+        # The step to run (possibly with a preview Resolution attached),
+        # or None to stop the job.
+        return step
+
+    def confirm_danger(self, reason: str) -> bool:
+        return False
+
+    def ensure_app_allowed(self, app: str) -> bool:
+        return False
+
+    def ensure_window_allowed(self) -> bool:
+        return False
+
+    def continue_after_fail(self, reason: str) -> bool:
+        return False
+
+    def step_progress(self, index: int, done: int, total: int) -> None:
+        pass
+
+    def step_done(self, index: int, step: Step, ok: bool, msg: str) -> None:
+        pass
+
+    def finished(self, job: "Job") -> None:
+        pass
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, steps: Iterable[Step], hooks: RunHooks) -> None:
+        # steps may be a lazy iterator (plan.compile_text); it is pulled
+        # from only as far as the runner needs to look ahead.
+        self.id = next(self._ids)
+        self.steps: List[Step] = steps if isinstance(steps, list) else []
+        self._source: Optional[Iterator[Step]] = None if isinstance(steps, list) else iter(steps)
+        self.hooks = hooks
+        self.state = "queued"
+        self.cancelled = False
+        self.results: List[Tuple[int, bool, str]] = []
+        self.pacer = Pacer()
+
+    def ensure(self, count: int) -> bool:
+        # Parse ahead until at least count steps are known.
+        while len(self.steps) < count and self._source is not None:
+            nxt = next(self._source, None)
+            if nxt is None:
+                self._source = None
+            else:
+                self.steps.append(nxt)
+        return len(self.steps) >= count
+
+    @property
+    def total(self) -> Optional[int]:
+        return len(self.steps) if self._source is None else None
+
+
+class PlanRunner:
+    def __init__(self, allowlist: List[str]) -> None:
+        self.allowlist = allowlist
+        self._jobs: "queue.Queue[Job]" = queue.Queue()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._lock = threading.Lock()
+        self._pending: List[Job] = []
+        self.current: Optional[Job] = None
+        self.prefetcher = Prefetcher()
+        self._thread = threading.Thread(target=self._loop, name="plan-runner", daemon=True)
+        self._thread.start()
+
+    def submit(self, steps: Iterable[Step], hooks: RunHooks) -> Job:
+        job = Job(steps, hooks)
+        with self._lock:
+            self._pending.append(job)
+        self._jobs.put(job)
+        return job
+
+    def busy(self) -> bool:
+        with self._lock:
+            return self.current is not None or bool(self._pending)
+
+    def cancel(self) -> None:
+        # Cancels the running job and everything queued behind it.
+        with self._lock:
+            jobs = list(self._pending)
+            if self.current is not None:
+                jobs.append(self.current)
+        for job in jobs:
+            job.cancelled = True
+        CANCEL.set()
+        self._resume.set()
+
+    def cancel_job(self, job: Job) -> None:
+        # Cancels one job; in-progress waits are interrupted only when it
+        # is the running one.
+        job.cancelled = True
+        with self._lock:
+            running = self.current is job
+        if running:
+            CANCEL.set()
+            self._resume.set()
+
+    def pause(self) -> None:
+        self._resume.clear()
+
+    def resume(self) -> None:
+        self._resume.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._resume.is_set()
+
+    def _loop(self) -> None:
+        while True:
+            job = self._jobs.get()
+            with self._lock:
+                self._pending.remove(job)
+                self.current = job
+            try:
+                if job.cancelled:
+                    job.state = "cancelled"
+                else:
+                    CANCEL.clear()
+                    job.state = "running"
+                    summary = tracing.begin_run(job.id)
+                    try:
+                        self._run(job)
+                    finally:
+                        tracing.end_run()
+                    if summary is not None:
+                        for line in summary.report():
+                            job.hooks.log(line)
+            except Exception as e:
+                job.state = "error"
+                job.hooks.log(f"[error] {e}")
+            finally:
+                with self._lock:
+                    self.current = None
+                job.hooks.finished(job)
+
+    def _run(self, job: Job) -> None:
+        hooks = job.hooks
+        pacer = job.pacer
+        i = -1
+        while job.ensure(i + 2):
+            i += 1
+            step = job.steps[i]
+            self._resume.wait()
+            if job.cancelled:
+                break
+            job.ensure(i + 1 + LOOKAHEAD)
+            hooks.progress(i + 1, job.total, step)
+            self.prefetcher.lookahead(job.steps, i)
+            step = hooks.step_preview(step)
+            if step is None:
+                hooks.log("[info] step-by-step cancelled")
+                break
+            if step.action == "pacing" and not step.error:
+                pacer.plan_profile = step.args["profile"]
+                continue
+            if not step.error:
+                if step.danger and not hooks.confirm_danger(step.danger):
+                    hooks.log("[blocked] user rejected dangerous action")
+                    continue
+                if step.window == "app":
+                    if not hooks.ensure_app_allowed(step.args["app"]):
+                        hooks.log("[blocked] app not in allowlist")
+                        continue
+                elif step.window == "active":
+                    if not hooks.ensure_window_allowed():
+                        hooks.log("[blocked] active window not in allowlist")
+                        continue
+            tracing.set_step(i)
+            t0 = time.perf_counter()
+            with tracing.span("step", action=step.action) as sp:
+                ok, msg = execute_step(
+                    step,
+                    self.allowlist,
+                    window_checked=True,
+                    progress=lambda done, total, i=i: hooks.step_progress(i, done, total),
+                    settle=pacer.profile(step)["settle"],
+                )
+                sp.set(ok=ok, msg=msg)
+            pacer.record(step, time.perf_counter() - t0)
+            if job.cancelled:
+                break
+            job.results.append((i, ok, msg))
+            hooks.step_done(i, step, ok, msg)
+            if not ok:
+                hooks.log(f"[warn] action failed: {msg}")
+                if job.ensure(i + 2) and not hooks.continue_after_fail(msg):
+                    break
+            pacer.after(step, job.steps[i + 1] if job.ensure(i + 2) else None)
+        job.state = "cancelled" if job.cancelled else "done"
+        hooks.log(pacer.report())
@@ -0,0 +1,292 @@
+"""Local HTTP control endpoint for the plan runner.
+
+    POST /plans[?name=N&stream=1]   body: plan (JSON array or action lines)
+    GET  /jobs/<id>                 state and all records so far
+    GET  /jobs/<id>/events[?from=K] records as JSON Lines until the job ends
+    POST /cancel                    cancel the running and queued jobs that
+                                    were submitted here (not GUI/CLI ones)
+
+Every request needs "Authorization: Bearer <token>". Records have the same
+shape as the cli.py output, plus the job id. A plan without a single
+runnable action (e.g. malformed JSON) is rejected with 400.
+"""
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from cli import PolicyHooks
+from config import (
+    ALLOWLIST_APPS,
+    SERVER_KEEP_JOBS,
+    SERVER_MAX_BODY,
+    SERVER_POLICY,
+    SERVER_PORT,
+    SERVER_TOKEN,
+    SERVER_TOKEN_FILE,
+)
+from plan import compile_text
+from runner import Job, PlanRunner
+
+HOST = "127.0.0.1"
+# Idle streams send a blank line this often so dead clients are noticed
+KEEPALIVE_S = 5.0
+
+LogCallback = Callable[[str], None]
+
+
+class ServerJob(PolicyHooks):
+    def __init__(
+        self,
+        name: str,
+        policy: Dict[str, bool],
+        allowlist: List[str],
+        log: Optional[LogCallback],
+    ) -> None:
+        super().__init__(name, policy, allowlist)
+        self.job: Optional[Job] = None
+        self.records: List[Dict[str, Any]] = []
+        self.bound = threading.Event()
+        self._cond = threading.Condition()
+        self._log = log
+
+    def write(self, record: Dict[str, Any]) -> None:
+        # The runner may start the job before submit() has returned it.
+        self.bound.wait()
+        with self._cond:
+            self.records.append({"job": self.job.id, "script": self.script, **record})
+            self._cond.notify_all()
+
+    def log(self, text: str) -> None:
+        if self._log:
+            self._log(f"[server] {self.script}: {text}")
+
+    def finished(self, job: Job) -> None:
+        super().finished(job)
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait_records(self, start: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        # Records from index start on, waiting up to timeout for new ones;
+        # the flag says the job has ended and nothing more will come.
+        with self._cond:
+            if len(self.records) <= start and not self.done.is_set():
+                self._cond.wait(timeout)
+            return self.records[start:], self.done.is_set()
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "job": self.job.id if self.job else None,
+                "script": self.script,
+                "state": self.job.state if self.job else "queued",
+                "records": list(self.records),
+            }
+
+
+class ControlServer:
+    def __init__(
+        self,
+        runner: PlanRunner,
+        allowlist: List[str],
+        token: str = SERVER_TOKEN,
+        port: int = SERVER_PORT,
+        policy: Optional[Dict[str, bool]] = None,
+        log: Optional[LogCallback] = None,
+    ) -> None:
+        self.runner = runner
+        self.allowlist = allowlist
+        self.token = token or secrets.token_urlsafe(24)
+        self.policy = dict(policy or SERVER_POLICY)
+        self.log = log
+        self.jobs: "OrderedDict[int, ServerJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((HOST, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def masked_token(self) -> str:
+        return "..." + self.token[-4:]
+
+    def save_token(self, path: str = SERVER_TOKEN_FILE) -> None:
+        # Readable by the owner only (where the OS honours the mode).
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.token + "\n")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="control-server", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> List[int]:
+        # Ids of the unfinished jobs submitted here, now cancelled.
+        with self._lock:
+            pending = [h.job for h in self.jobs.values() if h.job is not None and not h.done.is_set()]
+        for job in pending:
+            self.runner.cancel_job(job)
+        return [job.id for job in pending]
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def submit(self, text: str, name: str) -> ServerJob:
+        # Raises ValueError for a plan with no runnable action. The check
+        # compiles the whole plan, which leaves it in PLAN_CACHE for the run.
+        skipped: List[int] = []
+        steps = list(compile_text(text, on_error=lambda lineno, line: skipped.append(lineno)))
+        if not any(not s.error for s in steps):
+            detail = f"{len(skipped)} unparsed lines" if skipped else "empty plan"
+            raise ValueError(f"no runnable actions in plan ({detail})")
+        hooks = ServerJob(name, self.policy, self.allowlist, self.log)
+        with self._lock:
+            hooks.job = self.runner.submit(compile_text(text, on_error=hooks.skipped_line), hooks)
+            hooks.bound.set()
+            self.jobs[hooks.job.id] = hooks
+            while len(self.jobs) > SERVER_KEEP_JOBS:
+                oldest = next(iter(self.jobs.values()))
+                if not oldest.done.is_set():
+                    break
+                self.jobs.popitem(last=False)
+        return hooks
+
+    def get(self, job_id: int) -> Optional[ServerJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt: str, *args: Any) -> None:
+                pass
+
+            def _authorized(self) -> bool:
+                header = self.headers.get("Authorization", "")
+                given = header[7:] if header.startswith("Bearer ") else ""
+                if hmac.compare_digest(given.encode(), server.token.encode()):
+                    return True
+                self._send_json(401, {"error": "missing or invalid token"})
+                return False
+
+            def _send_json(self, code: int, body: Dict[str, Any]) -> None:
+                raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _stream(self, hooks: ServerJob, start: int) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                pos = start
+                try:
+                    while True:
+                        records, ended = hooks.wait_records(pos, KEEPALIVE_S)
+                        if records:
+                            pos += len(records)
+                            lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+                            self.wfile.write(lines.encode("utf-8"))
+                        elif not ended:
+                            self.wfile.write(b"\n")
+                        self.wfile.flush()
+                        if ended and not records:
+                            return
+                except OSError:
+                    # Client went away; the job keeps running.
+                    return
+
+            def do_POST(self) -> None:
+                if not self._authorized():
+                    return
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/cancel":
+                    self._send_json(200, {"cancelled": server.cancel()})
+                    return
+                if url.path != "/plans":
+                    self._send_json(404, {"error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    self._send_json(400, {"error": "invalid Content-Length"})
+                    return
+                if length <= 0 or length > SERVER_MAX_BODY:
+                    self._send_json(413 if length else 400, {"error": "plan body missing or too large"})
+                    return
+                text = self.rfile.read(length).decode("utf-8", errors="replace")
+                name = query.get("name", [f"plan from {self.client_address[0]}"])[0]
+                queued = server.runner.busy()
+                try:
+                    hooks = server.submit(text, name)
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                if server.log:
+                    server.log(f"[server] job {hooks.job.id} {'queued' if queued else 'started'}: {name}")
+                if query.get("stream", ["0"])[0] not in ("", "0", "false"):
+                    self._stream(hooks, 0)
+                else:
+                    self._send_json(202, {"job": hooks.job.id, "queued": queued})
+
+            def do_GET(self) -> None:
+                if not self._authorized():
+                    return
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                hooks = None
+                if len(parts) >= 2 and parts[0] == "jobs" and parts[1].isdigit():
+                    hooks = server.get(int(parts[1]))
+                if hooks is None:
+                    self._send_json(404, {"error": "not found"})
+                    return
+                if len(parts) == 2:
+                    self._send_json(200, hooks.status())
+                elif parts[2:] == ["events"]:
+                    start = parse_qs(url.query).get("from", ["0"])[0]
+                    self._stream(hooks, int(start) if start.isdigit() else 0)
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Serve the plan runner on localhost without the GUI.")
+    ap.add_argument("--port", type=int, default=SERVER_PORT)
+    ap.add_argument("--allow", action="append", default=[], help="extra allowlist keyword")
+    opts = ap.parse_args(argv)
+
+    allowlist = list(ALLOWLIST_APPS) + opts.allow
+    server = ControlServer(
+        PlanRunner(allowlist), allowlist, port=opts.port, log=lambda text: print(text, file=sys.stderr)
+    )
+    print(f"listening on {server.url}", file=sys.stderr)
+    print(f"token: {server.token}", file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.runner.cancel()
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
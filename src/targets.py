@@ -0,0 +1,194 @@
+import atexit
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from backends import get_input
+from capture import grab_gray_at
+from config import (
+    TARGET_CACHE_FILE,
+    TARGET_CACHE_MATCH,
+    TARGET_CACHE_PATCH,
+    TARGET_CACHE_SIZE,
+    TARGET_CACHE_SLACK,
+)
+from guardrails import active_window_title, allowed_keyword
+from tracing import span
+
+# (window keyword, query, resolution)
+TargetKey = Tuple[str, str, str]
+
+# Patches flatter than this (std of gray levels) would match almost
+# anywhere, so such targets are not remembered
+MIN_PATCH_STD = 4.0
+
+# New entries are written to disk this many seconds after the first one
+# (and at exit), off the step's critical path
+SAVE_DELAY = 5.0
+
+_PATCH_SHAPE = (2 * TARGET_CACHE_PATCH, 2 * TARGET_CACHE_PATCH)
+
+
+def target_key(query: str, allowlist: Optional[List[str]] = None) -> TargetKey:
+    w, h = get_input().screen_size()
+    keyword = allowed_keyword(active_window_title(), allowlist) or ""
+    return keyword, query, f"{w}x{h}"
+
+
+def _patch_box(
+    gray: np.ndarray, origin: Tuple[int, int], x: int, y: int, pad: int
+) -> Optional[Tuple[int, int, int, int]]:
+    # Frame-relative box around screen point (x, y), if it fits the frame.
+    fh, fw = gray.shape[:2]
+    x, y = x - origin[0], y - origin[1]
+    x0, y0 = x - TARGET_CACHE_PATCH - pad, y - TARGET_CACHE_PATCH - pad
+    x1, y1 = x + TARGET_CACHE_PATCH + pad, y + TARGET_CACHE_PATCH + pad
+    if x0 < 0 or y0 < 0 or x1 > fw or y1 > fh:
+        return None
+    return x0, y0, x1, y1
+
+
+class TargetCache:
+    # Where each (window, query, resolution) last matched, plus the gray
+    # pixels around that point. Persisted to one .npz like the icon cache;
+    # path None keeps it in memory only.
+
+    def __init__(self, path: Optional[str], size: int) -> None:
+        self.path = path
+        self.size = size
+        self._items: "OrderedDict[TargetKey, Tuple[int, int, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+
+    def load(self) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+    def _load(self) -> None:
+        self._loaded = True
+        if self.path is None:
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as npz:
+                manifest = json.loads(str(npz["manifest"]))
+                for i, (key, x, y) in enumerate(manifest):
+                    patch = npz[f"p_{i}"]
+                    # Entries cut with another TARGET_CACHE_PATCH are dropped
+                    if patch.shape == _PATCH_SHAPE and patch.dtype == np.uint8:
+                        self._items[tuple(key)] = (int(x), int(y), patch)
+        except Exception:
+            # Missing, truncated or foreign file: start empty
+            self._items.clear()
+
+    def _schedule_save(self) -> None:
+        # Called with self._lock held.
+        self._dirty = True
+        if self.path is None or self._timer is not None:
+            return
+        self._timer = threading.Timer(SAVE_DELAY, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        # Write pending entries, if any.
+        with self._save_lock:
+            with self._lock:
+                self._timer = None
+                if not self._dirty or self.path is None:
+                    return
+                self._dirty = False
+                items = list(self._items.items())
+                path = self.path
+            manifest = []
+            arrays = {}
+            for i, (key, (x, y, patch)) in enumerate(items):
+                manifest.append([list(key), x, y])
+                arrays[f"p_{i}"] = patch
+            arrays["manifest"] = np.array(json.dumps(manifest))
+            tmp = path + ".tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp, path)
+            except OSError:
+                pass
+
+    def reset(self, path: Optional[str] = None) -> None:
+        # Drop every entry and switch to `path` (None = memory only).
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._items.clear()
+            self.path = path
+            self._loaded = False
+            self._dirty = False
+
+    def lookup(self, key: TargetKey, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int]]:
+        # The remembered point if its patch is still on screen (allowing a
+        # small shift), else None.
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._items.get(key)
+        if entry is None:
+            return None
+        x, y, patch = entry
+        if region is not None:
+            rx, ry, rw, rh = region
+            if not (rx <= x < rx + rw and ry <= y < ry + rh):
+                return None
+        with span("target.verify"):
+            gray, origin = grab_gray_at()
+            box = _patch_box(gray, origin, x, y, TARGET_CACHE_SLACK)
+            if box is None:
+                return None
+            x0, y0, x1, y1 = box
+            try:
+                res = cv2.matchTemplate(gray[y0:y1, x0:x1], patch, cv2.TM_CCOEFF_NORMED)
+            except cv2.error:
+                # A patch this cache cannot use is a miss, never a failed step
+                return None
+            _, score, _, (dx, dy) = cv2.minMaxLoc(res)
+        if score < TARGET_CACHE_MATCH:
+            return None
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+        return x + dx - TARGET_CACHE_SLACK, y + dy - TARGET_CACHE_SLACK
+
+    def store(self, key: TargetKey, pos: Tuple[int, int], searched: Tuple[np.ndarray, int, int]) -> None:
+        # searched: the (image, x, y) the target was found in
+        # (vision.last_searched()), so the patch shows the matched pixels.
+        if self.size <= 0:
+            return
+        x, y = int(pos[0]), int(pos[1])
+        gray, ox, oy = searched
+        box = _patch_box(gray, (ox, oy), x, y, 0)
+        if box is None:
+            return
+        x0, y0, x1, y1 = box
+        patch = np.ascontiguousarray(gray[y0:y1, x0:x1])
+        if float(patch.std()) < MIN_PATCH_STD:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._items[key] = (x, y, patch)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+            self._schedule_save()
+
+
+TARGET_CACHE = TargetCache(TARGET_CACHE_FILE, TARGET_CACHE_SIZE)
+atexit.register(TARGET_CACHE.flush)
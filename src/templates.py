@@ -0,0 +1,290 @@
+import json
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from config import IMAGE_CONFIDENCE, TEMPLATE_SCALES
+
+# Coarsest pyramid level still needs a template at least this big
+MIN_TEMPLATE_SIDE = 12
+MAX_PYRAMID_LEVELS = 3
+# Coarse-level candidates are kept if within this much of the threshold
+COARSE_SLACK = 0.2
+COARSE_PEAKS = 3
+
+ICON_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+ICON_CACHE_NAME = ".icon_cache.npz"
+LIBRARY_HITS_PER_ICON = 5
+
+
+class ImageMatch(NamedTuple):
+    x: int
+    y: int
+    score: float
+    scale: float
+    box: Tuple[int, int, int, int]
+
+
+class _Template:
+    def __init__(self, gray: np.ndarray, stamp: Tuple[int, int]) -> None:
+        self.gray = gray
+        self.stamp = stamp
+        self.pyramids: Dict[float, List[np.ndarray]] = {}
+
+    def pyramid(self, scale: float) -> List[np.ndarray]:
+        pyr = self.pyramids.get(scale)
+        if pyr is None:
+            img = self.gray
+            if scale != 1.0:
+                interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+                img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=interp)
+            pyr = build_pyramid(img, _levels_for(img.shape))
+            self.pyramids[scale] = pyr
+        return pyr
+
+
+_templates: Dict[str, _Template] = {}
+_lock = threading.Lock()
+
+
+def _levels_for(shape: Tuple[int, ...]) -> int:
+    side = min(shape[:2])
+    levels = 0
+    while levels < MAX_PYRAMID_LEVELS and side // 2 >= MIN_TEMPLATE_SIDE:
+        side //= 2
+        levels += 1
+    return levels
+
+
+def build_pyramid(img: np.ndarray, levels: int) -> List[np.ndarray]:
+    pyr = [img]
+    for _ in range(levels):
+        pyr.append(cv2.pyrDown(pyr[-1]))
+    return pyr
+
+
+def load_template(path: str) -> _Template:
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise ValueError(f"cannot read image: {path}")
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(path)
+    with _lock:
+        tpl = _templates.get(key)
+        if tpl is not None and tpl.stamp == stamp:
+            return tpl
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError(f"cannot read image: {path}")
+    tpl = _Template(gray, stamp)
+    with _lock:
+        _templates[key] = tpl
+    return tpl
+
+
+def _peaks(res: np.ndarray, floor: float, count: int, tw: int, th: int) -> List[Tuple[int, int]]:
+    res = res.copy()
+    found = []
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(res)
+        if max_val < floor:
+            break
+        found.append((x, y))
+        res[max(0, y - th // 2):y + th // 2 + 1, max(0, x - tw // 2):x + tw // 2 + 1] = -1.0
+    return found
+
+
+def _search(
+    frame_pyr: List[np.ndarray],
+    tpl_pyr: List[np.ndarray],
+    threshold: float,
+    max_hits: int,
+) -> List[Tuple[int, int, float]]:
+    # Coarse search on the smallest shared level, then exact refinement
+    # in a small window around each coarse peak at full resolution.
+    level = min(len(frame_pyr), len(tpl_pyr)) - 1
+    frame_l, tpl_l = frame_pyr[level], tpl_pyr[level]
+    if tpl_l.shape[0] > frame_l.shape[0] or tpl_l.shape[1] > frame_l.shape[1]:
+        return []
+    res = cv2.matchTemplate(frame_l, tpl_l, cv2.TM_CCOEFF_NORMED)
+    if level == 0:
+        return [
+            (x, y, float(res[y, x]))
+            for x, y in _peaks(res, threshold, max_hits, tpl_l.shape[1], tpl_l.shape[0])
+        ]
+
+    frame, tpl = frame_pyr[0], tpl_pyr[0]
+    th, tw = tpl.shape[:2]
+    fh, fw = frame.shape[:2]
+    factor = 2 ** level
+    margin = factor + 2
+    hits = []
+    peaks = _peaks(res, threshold - COARSE_SLACK, max(max_hits, COARSE_PEAKS), tpl_l.shape[1], tpl_l.shape[0])
+    for cx, cy in peaks:
+        x0 = max(0, cx * factor - margin)
+        y0 = max(0, cy * factor - margin)
+        x1 = min(fw, cx * factor + tw + margin)
+        y1 = min(fh, cy * factor + th + margin)
+        if x1 - x0 < tw or y1 - y0 < th:
+            continue
+        fine = cv2.matchTemplate(frame[y0:y1, x0:x1], tpl, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, (x, y) = cv2.minMaxLoc(fine)
+        if max_val >= threshold:
+            hits.append((x0 + x, y0 + y, float(max_val)))
+    hits.sort(key=lambda h: -h[2])
+    return hits[:max_hits]
+
+
+def match_template(
+    frame_gray: np.ndarray,
+    path: str,
+    threshold: float = IMAGE_CONFIDENCE,
+    scales: Sequence[float] = TEMPLATE_SCALES,
+) -> Optional[ImageMatch]:
+    tpl = load_template(path)
+    frame_pyr = build_pyramid(frame_gray, MAX_PYRAMID_LEVELS)
+    for scale in scales:
+        tpl_pyr = tpl.pyramid(scale)
+        hits = _search(frame_pyr, tpl_pyr, threshold, 1)
+        if hits:
+            x, y, score = hits[0]
+            th, tw = tpl_pyr[0].shape[:2]
+            return ImageMatch(x + tw // 2, y + th // 2, score, scale, (x, y, tw, th))
+    return None
+
+
+class IconHit(NamedTuple):
+    name: str
+    x: int
+    y: int
+    score: float
+    scale: float
+    box: Tuple[int, int, int, int]
+
+
+class IconLibrary:
+    # All images in one directory, with their scaled pyramids persisted to
+    # an .npz next to them so later runs skip decoding and resizing.
+
+    def __init__(self, directory: str, scales: Sequence[float] = TEMPLATE_SCALES) -> None:
+        self.directory = os.path.abspath(directory)
+        self.scales = list(scales)
+        self.stamps: Dict[str, List[int]] = {}
+        self.pyramids: Dict[str, Dict[float, List[np.ndarray]]] = {}
+        # refresh() runs on both the prefetch and the runner thread
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def _scan(self) -> Dict[str, List[int]]:
+        stamps = {}
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.lower().endswith(ICON_EXTENSIONS):
+                st = entry.stat()
+                stamps[entry.name] = [st.st_mtime_ns, st.st_size]
+        return stamps
+
+    def refresh(self) -> None:
+        with self._lock:
+            try:
+                stamps = self._scan()
+            except OSError:
+                raise ValueError(f"cannot read icon directory: {self.directory}")
+            if stamps == self.stamps and self.pyramids:
+                return
+            self.stamps = stamps
+            if not self._load_cache():
+                self._build()
+                self._save_cache()
+
+    def _cache_path(self) -> str:
+        return os.path.join(self.directory, ICON_CACHE_NAME)
+
+    def _manifest(self) -> str:
+        return json.dumps({"stamps": self.stamps, "scales": self.scales}, sort_keys=True)
+
+    def _load_cache(self) -> bool:
+        try:
+            with np.load(self._cache_path(), allow_pickle=False) as npz:
+                if str(npz["manifest"]) != self._manifest():
+                    return False
+                pyramids: Dict[str, Dict[float, List[np.ndarray]]] = {}
+                for i, name in enumerate(sorted(self.stamps)):
+                    pyramids[name] = {}
+                    for j, scale in enumerate(self.scales):
+                        levels = int(npz[f"n_{i}_{j}"])
+                        pyramids[name][scale] = [npz[f"p_{i}_{j}_{k}"] for k in range(levels)]
+        except Exception:
+            # Missing, stale, truncated or foreign file: rebuild
+            return False
+        self.pyramids = pyramids
+        return True
+
+    def _build(self) -> None:
+        pyramids: Dict[str, Dict[float, List[np.ndarray]]] = {}
+        for name in sorted(self.stamps):
+            gray = cv2.imread(os.path.join(self.directory, name), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                continue
+            tpl = _Template(gray, tuple(self.stamps[name]))
+            pyramids[name] = {scale: tpl.pyramid(scale) for scale in self.scales}
+        self.stamps = {n: st for n, st in self.stamps.items() if n in pyramids}
+        self.pyramids = pyramids
+
+    def _save_cache(self) -> None:
+        arrays = {"manifest": np.array(self._manifest())}
+        for i, name in enumerate(sorted(self.stamps)):
+            for j, scale in enumerate(self.scales):
+                pyr = self.pyramids[name][scale]
+                arrays[f"n_{i}_{j}"] = np.array(len(pyr))
+                for k, level in enumerate(pyr):
+                    arrays[f"p_{i}_{j}_{k}"] = level
+        path = self._cache_path()
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def match_all(self, frame_gray: np.ndarray, threshold: float = IMAGE_CONFIDENCE) -> List[IconHit]:
+        frame_pyr = build_pyramid(frame_gray, MAX_PYRAMID_LEVELS)
+        hits: List[IconHit] = []
+        for name, by_scale in self.pyramids.items():
+            found: List[IconHit] = []
+            for scale, tpl_pyr in by_scale.items():
+                th, tw = tpl_pyr[0].shape[:2]
+                for x, y, score in _search(frame_pyr, tpl_pyr, threshold, LIBRARY_HITS_PER_ICON):
+                    found.append(IconHit(name, x + tw // 2, y + th // 2, score, scale, (x, y, tw, th)))
+            hits.extend(_suppress(found))
+        hits.sort(key=lambda h: -h.score)
+        return hits
+
+
+def _suppress(hits: List[IconHit]) -> List[IconHit]:
+    # Drop hits whose center falls inside a better hit of the same icon
+    # (typically the same button found at two scales).
+    kept: List[IconHit] = []
+    for h in sorted(hits, key=lambda h: -h.score):
+        if not any(k.box[0] <= h.x < k.box[0] + k.box[2] and k.box[1] <= h.y < k.box[1] + k.box[3] for k in kept):
+            kept.append(h)
+    return kept
+
+
+_libraries: Dict[str, IconLibrary] = {}
+
+
+def get_library(directory: str) -> IconLibrary:
+    key = os.path.abspath(directory)
+    with _lock:
+        lib = _libraries.get(key)
+        if lib is None:
+            lib = IconLibrary(key)
+            _libraries[key] = lib
+            return lib
+    lib.refresh()
+    return lib
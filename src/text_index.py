@@ -0,0 +1,132 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, NamedTuple, Set, Tuple
+
+# (left, top, width, height) in the coordinates of the OCR'd image
+Box = Tuple[int, int, int, int]
+
+
+class TextMatch(NamedTuple):
+    x: int
+    y: int
+    score: float
+    text: str
+    box: Box
+
+
+def _score(q: str, w: str) -> float:
+    if q == w:
+        return 1.0
+    if q in w or w in q:
+        return 0.92
+    return SequenceMatcher(None, q, w).ratio()
+
+
+def _grams(text: str) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def _union(boxes: List[Box]) -> Box:
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[0] + b[2] for b in boxes)
+    y1 = max(b[1] + b[3] for b in boxes)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class _Entries:
+    # Exact-text map plus a character bigram index over one list of strings.
+
+    def __init__(self, texts: List[str], boxes: List[Box]) -> None:
+        self.texts = texts
+        self.boxes = boxes
+        self.exact: Dict[str, List[int]] = defaultdict(list)
+        self.grams: Dict[str, List[int]] = defaultdict(list)
+        for i, t in enumerate(texts):
+            self.exact[t].append(i)
+            for g in _grams(t):
+                self.grams[g].append(i)
+
+    def _candidates(self, q: str) -> List[int]:
+        if len(q) < 2:
+            return list(range(len(self.texts)))
+        qgrams = _grams(q)
+        counts: Dict[int, int] = defaultdict(int)
+        for g in qgrams:
+            for i in self.grams.get(g, ()):
+                counts[i] += 1
+        need = max(1, len(qgrams) // 3)
+        return [i for i, c in counts.items() if c >= need]
+
+    def search(self, q: str, min_score: float) -> List[Tuple[float, int]]:
+        hits = [(1.0, i) for i in self.exact.get(q, ())]
+        if hits:
+            return hits
+        scored = []
+        for i in self._candidates(q):
+            s = _score(q, self.texts[i])
+            if s >= min_score:
+                scored.append((s, i))
+        return scored
+
+
+class WordIndex:
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+        texts: List[str] = []
+        boxes: List[Box] = []
+        lines: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+        n = len(data.get("text", []))
+        for i in range(n):
+            t = str(data["text"][i]).lower().strip()
+            if not t:
+                continue
+            box = (int(data["left"][i]), int(data["top"][i]), int(data["width"][i]), int(data["height"][i]))
+            key = (
+                _col(data, "block_num", i),
+                _col(data, "par_num", i),
+                _col(data, "line_num", i),
+            )
+            lines[key].append(len(texts))
+            texts.append(t)
+            boxes.append(box)
+        self.words = _Entries(texts, boxes)
+        self.lines = [sorted(ids, key=lambda j: boxes[j][0]) for ids in lines.values()]
+        self._phrases: Dict[int, _Entries] = {}
+
+    def _phrase_entries(self, k: int) -> _Entries:
+        entries = self._phrases.get(k)
+        if entries is None:
+            texts: List[str] = []
+            boxes: List[Box] = []
+            for ids in self.lines:
+                for s in range(len(ids) - k + 1):
+                    window = ids[s:s + k]
+                    texts.append(" ".join(self.words.texts[j] for j in window))
+                    boxes.append(_union([self.words.boxes[j] for j in window]))
+            entries = _Entries(texts, boxes)
+            self._phrases[k] = entries
+        return entries
+
+    def search(self, query: str, min_score: float = 0.75, limit: int = 5) -> List[TextMatch]:
+        q = " ".join(query.lower().split())
+        if not q:
+            return []
+        k = len(q.split(" "))
+        entries = self._phrase_entries(k) if k > 1 else self.words
+        scored = entries.search(q, min_score)
+        if not scored and k > 1:
+            entries = self.words
+            scored = entries.search(q, min_score)
+        scored.sort(key=lambda si: (-si[0], entries.boxes[si[1]][1], entries.boxes[si[1]][0]))
+        result = []
+        for s, i in scored[:limit]:
+            x, y, w, h = entries.boxes[i]
+            result.append(TextMatch(x + w // 2, y + h // 2, s, entries.texts[i], entries.boxes[i]))
+        return result
+
+
+def _col(data: Dict[str, Any], key: str, i: int) -> int:
+    col = data.get(key)
+    return int(col[i]) if col else 0
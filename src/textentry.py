@@ -0,0 +1,105 @@
+import time
+from typing import Callable, Iterator, Optional
+
+from backends import get_input
+from cancel import CANCEL
+from config import (
+    TYPE_CHAR_INTERVAL,
+    TYPE_CHUNK_SIZE,
+    TYPE_MODE_BY_WINDOW,
+    TYPE_PASTE_KEYS,
+    TYPE_PASTE_MIN,
+    TYPE_PASTE_SETTLE,
+)
+from guardrails import active_window_title
+
+MODES = ("auto", "paste", "batch", "char")
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _chunks(text: str, size: int) -> Iterator[str]:
+    # Split at the last newline inside each window when there is one, so
+    # typed chunks end on line boundaries.
+    start = 0
+    n = len(text)
+    while start < n:
+        end = min(n, start + size)
+        if end < n:
+            cut = text.rfind("\n", start, end)
+            if cut > start:
+                end = cut + 1
+        yield text[start:end]
+        start = end
+
+
+def window_mode() -> Optional[str]:
+    if not TYPE_MODE_BY_WINDOW:
+        return None
+    title = active_window_title().lower()
+    for keyword, mode in TYPE_MODE_BY_WINDOW.items():
+        if keyword.lower() in title:
+            return mode
+    return None
+
+
+def _pick(text: str) -> str:
+    if len(text) >= TYPE_PASTE_MIN or not text.isascii():
+        return "paste"
+    return "batch"
+
+
+def _paste(text: str, settle: float) -> None:
+    # One clipboard round-trip for the whole text. The target reads the
+    # clipboard asynchronously, so it is restored only after a settle time.
+    keys = get_input()
+    # Only text round-trips; non-text clipboard contents come back as an
+    # empty string.
+    saved = keys.get_clipboard()
+    keys.set_clipboard(text)
+    try:
+        keys.hotkey(*TYPE_PASTE_KEYS)
+        # Not cut short by CANCEL: restoring early would paste the old text
+        time.sleep(max(TYPE_PASTE_SETTLE, settle))
+    finally:
+        keys.set_clipboard(saved)
+
+
+def type_text(
+    text: str,
+    mode: str = "auto",
+    allow_paste: bool = True,
+    progress: Optional[ProgressCallback] = None,
+    chunk_size: int = TYPE_CHUNK_SIZE,
+    settle: float = 0.0,
+) -> bool:
+    # Returns False when cancelled between chunks. allow_paste=False keeps
+    # every mode, including per-window overrides, off the clipboard (used
+    # for sensitive text). settle: the pacing profile's settle time, the
+    # least the clipboard is left in place after pasting.
+    if mode == "auto":
+        mode = window_mode() or "auto"
+    if mode == "auto":
+        mode = _pick(text)
+    if mode == "paste" and not allow_paste:
+        mode = "batch"
+    total = len(text)
+    if mode == "paste":
+        if CANCEL.is_set():
+            return False
+        _paste(text, settle)
+        if progress:
+            progress(total, total)
+        return True
+
+    keys = get_input()
+    interval = TYPE_CHAR_INTERVAL if mode == "char" else 0
+    done = 0
+    for chunk in _chunks(text, max(1, chunk_size)):
+        if CANCEL.is_set():
+            return False
+        keys.write(chunk, interval)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return True
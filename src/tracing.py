@@ -0,0 +1,200 @@
+import itertools
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import TRACE_BACKUPS, TRACE_ENABLED, TRACE_FILE, TRACE_MAX_BYTES
+
+# Spans whose time counts as OCR in the run summary
+OCR_SPANS = ("ocr.preprocess", "ocr.tesseract")
+# One "check" span per locate/wait attempt; attempts beyond the first are retries
+CHECK_SPAN = "check"
+SLOWEST_STEPS = 3
+
+_enabled = TRACE_ENABLED
+_local = threading.local()
+_ids = itertools.count(1)
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def _get_logger() -> logging.Logger:
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                logger = logging.getLogger("gpt_control.trace")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                handler = logging.handlers.RotatingFileHandler(
+                    TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS, encoding="utf-8", delay=True
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def _write(record: Dict[str, Any]) -> None:
+    try:
+        _get_logger().info(json.dumps(record, default=str, ensure_ascii=False))
+    except Exception:
+        pass
+
+
+def event(name: str, **fields: Any) -> None:
+    # Written whether or not spans are enabled; meant for rare records
+    # such as exceptions.
+    record = {"ts": time.time(), "event": name, "thread": threading.current_thread().name}
+    record.update(_context())
+    record.update(fields)
+    _write(record)
+
+
+class RunSummary:
+    # Per-run aggregates of the spans recorded on the runner thread.
+
+    def __init__(self, run_id: int) -> None:
+        self.run_id = run_id
+        self.started = time.perf_counter()
+        self.by_span: Dict[str, float] = defaultdict(float)
+        self.steps: Dict[int, Tuple[str, float]] = {}
+        self.checks: Dict[int, int] = defaultdict(int)
+
+    def add(self, name: str, step: Optional[int], seconds: float, fields: Dict[str, Any]) -> None:
+        if name == "step" and step is not None:
+            self.steps[step] = (str(fields.get("action", "")), seconds)
+            return
+        self.by_span[name] += seconds
+        if name == CHECK_SPAN and step is not None:
+            self.checks[step] += 1
+
+    def report(self) -> List[str]:
+        total = time.perf_counter() - self.started
+        ocr = sum(self.by_span.get(n, 0.0) for n in OCR_SPANS)
+        retries = sum(max(0, n - 1) for n in self.checks.values())
+        lines = [
+            f"[trace] run {self.run_id}: {len(self.steps)} steps in {total:.2f}s, "
+            f"OCR {ocr:.2f}s ({100 * ocr / total if total else 0:.0f}%), retries {retries}"
+        ]
+        # check spans wrap the phases below them, so they are left out here
+        phases = sorted(((n, s) for n, s in self.by_span.items() if n != CHECK_SPAN), key=lambda kv: -kv[1])
+        if phases:
+            lines.append("[trace]   " + ", ".join(f"{n} {s:.2f}s" for n, s in phases))
+        slowest = sorted(self.steps.items(), key=lambda kv: -kv[1][1])[:SLOWEST_STEPS]
+        for index, (action, seconds) in slowest:
+            extra = f", {self.checks[index]} checks" if self.checks.get(index) else ""
+            lines.append(f"[trace]   step {index + 1} {action}: {seconds:.2f}s{extra}")
+        return lines
+
+
+def _context() -> Dict[str, Any]:
+    ctx = {}
+    run = getattr(_local, "run", None)
+    if run is not None:
+        ctx["run"] = run.run_id
+    step = getattr(_local, "step", None)
+    if step is not None:
+        ctx["step"] = step
+    return ctx
+
+
+def begin_run(run_id: int) -> Optional[RunSummary]:
+    # Spans on this thread are attributed to the run until end_run().
+    if not _enabled:
+        return None
+    summary = RunSummary(run_id)
+    _local.run = summary
+    _local.step = None
+    return summary
+
+
+def set_step(index: Optional[int]) -> None:
+    if _enabled:
+        _local.step = index
+
+
+def end_run() -> None:
+    _local.run = None
+    _local.step = None
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("name", "fields", "id", "parent", "t0")
+
+    def __init__(self, name: str, fields: Dict[str, Any]) -> None:
+        self.name = name
+        self.fields = fields
+        self.id = 0
+        self.parent: Optional[int] = None
+        self.t0 = 0.0
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def __enter__(self) -> "_Span":
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.id = next(_ids)
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        seconds = time.perf_counter() - self.t0
+        _local.stack.pop()
+        record = {
+            "ts": time.time(),
+            "span": self.name,
+            "id": self.id,
+            "parent": self.parent,
+            "ms": round(seconds * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        record.update(_context())
+        record.update(self.fields)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        _write(record)
+        run = getattr(_local, "run", None)
+        if run is not None:
+            run.add(self.name, getattr(_local, "step", None), seconds, self.fields)
+        return False
+
+
+def span(name: str, **fields: Any) -> Any:
+    # Timing span for a with-block; a shared no-op when tracing is off.
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, fields)
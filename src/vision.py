@@ -1,75 +1,135 @@
-from typing import Optional, Tuple
-from difflib import SequenceMatcher
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
-import pyautogui
-import pytesseract
-import cv2
 import numpy as np
 
-from config import TESSERACT_CMD
-
-
-def _set_tesseract_cmd() -> None:
-    if TESSERACT_CMD:
-        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-
-
-def _best_match(query: str, words: list[str]) -> Tuple[int, float]:
-    q = query.lower().strip()
-    best_i = -1
-    best_score = 0.0
-    for i, w in enumerate(words):
-        w = str(w).lower().strip()
-        if not w:
-            continue
-        if q == w:
-            return i, 1.0
-        if q in w or w in q:
-            score = 0.92
-        else:
-            score = SequenceMatcher(None, q, w).ratio()
-        if score > best_score:
-            best_score = score
-            best_i = i
-    return best_i, best_score
-
-
-def _preprocess(img_bgr: np.ndarray) -> np.ndarray:
-    h, w = img_bgr.shape[:2]
-    if max(h, w) < 1400:
-        img_bgr = cv2.resize(img_bgr, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_CUBIC)
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (3, 3), 0)
-    _, th = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    return th
-
-
-def locate_text(query: str) -> Optional[Tuple[int, int]]:
-    _set_tesseract_cmd()
-    screenshot = pyautogui.screenshot()
-    img = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-    proc = _preprocess(img)
-    data = pytesseract.image_to_data(
-        proc,
-        output_type=pytesseract.Output.DICT,
-        config="--oem 3 --psm 6",
-    )
-    words = data.get("text", [])
-    idx, score = _best_match(query, words)
-    if idx == -1 or score < 0.75:
+from actions import OCR_ACTIONS
+from backends import get_ocr
+from capture import Origin, frame_fingerprint, grab_gray_at
+from config import TEMPLATE_SCALES
+from ocr import OCR_CACHE
+from templates import IconHit, ImageMatch, get_library, load_template, match_template
+from text_index import TextMatch, WordIndex
+from tracing import span
+
+# Screen-space box as (x, y, width, height)
+Region = Tuple[int, int, int, int]
+
+# Per thread: the (image, x, y) the latest search looked at
+_searched = threading.local()
+
+
+def _crop(img: np.ndarray, region: Optional[Region], origin: Origin = (0, 0)) -> Tuple[np.ndarray, int, int]:
+    # Part of a frame captured at origin, and that part's screen position.
+    ox, oy = origin
+    if region is None:
+        return img, ox, oy
+    x, y, w, h = region
+    fh, fw = img.shape[:2]
+    x0, y0 = max(0, int(x) - ox), max(0, int(y) - oy)
+    x1, y1 = min(fw, int(x + w) - ox), min(fh, int(y + h) - oy)
+    if x1 <= x0 or y1 <= y0:
+        raise ValueError(f"region outside screen: {region}")
+    return img[y0:y1, x0:x1], x0 + ox, y0 + oy
+
+
+def _grab(region: Optional[Region], max_age: Optional[float] = None) -> Tuple[np.ndarray, int, int]:
+    # OCR and template matching both work on the gray frame.
+    img, origin = grab_gray_at(max_age)
+    searched = _crop(img, region, origin)
+    _searched.last = searched
+    return searched
+
+
+def last_searched() -> Optional[Tuple[np.ndarray, int, int]]:
+    # The image (and its screen position) that the latest locate_* or
+    # region_fingerprint call on this thread searched, so results can be
+    # tied to the exact pixels they came from.
+    return getattr(_searched, "last", None)
+
+
+def _ocr(img: np.ndarray, ox: int = 0, oy: int = 0) -> WordIndex:
+    # Boxes in the returned index are in the coordinates of img.
+    backend = get_ocr()
+    key = f"{frame_fingerprint(img)}:{backend.tag}"
+    index = OCR_CACHE.get(key)
+    if index is None:
+        index = WordIndex(backend.read(img, (ox, oy)))
+        OCR_CACHE.put(key, index)
+    return index
+
+
+def region_fingerprint(region: Optional[Region] = None, max_age: Optional[float] = None) -> str:
+    img, _, _ = _grab(region, max_age)
+    return frame_fingerprint(img)
+
+
+def locate_texts(
+    queries: List[str],
+    region: Optional[Region] = None,
+    min_score: float = 0.75,
+    limit: int = 5,
+) -> Dict[str, List[TextMatch]]:
+    img, ox, oy = _grab(region)
+    index = _ocr(img, ox, oy)
+    result = {}
+    for q in queries:
+        with span("match.text"):
+            matches = index.search(q, min_score=min_score, limit=limit)
+        result[q] = [
+            m._replace(x=m.x + ox, y=m.y + oy, box=(m.box[0] + ox, m.box[1] + oy, m.box[2], m.box[3]))
+            for m in matches
+        ]
+    return result
+
+
+def locate_text(query: str, region: Optional[Region] = None) -> Optional[Tuple[int, int]]:
+    matches = locate_texts([query], region, limit=1)[query]
+    if not matches:
         return None
-    x = int(data["left"][idx])
-    y = int(data["top"][idx])
-    w = int(data["width"][idx])
-    h = int(data["height"][idx])
-    return x + w // 2, y + h // 2
-
-
-def locate_image(path: str) -> Optional[Tuple[int, int]]:
-    try:
-        return pyautogui.locateCenterOnScreen(path, confidence=0.85)
-    except Exception:
-        try:
-            return pyautogui.locateCenterOnScreen(path)
-        except Exception:
-            return None
+    return matches[0].x, matches[0].y
+
+
+def locate_image_match(path: str, region: Optional[Region] = None) -> Optional[ImageMatch]:
+    img, ox, oy = _grab(region)
+    with span("match.template"):
+        m = match_template(img, path)
+    if m is None:
+        return None
+    return m._replace(x=m.x + ox, y=m.y + oy, box=(m.box[0] + ox, m.box[1] + oy, m.box[2], m.box[3]))
+
+
+def locate_image(path: str, region: Optional[Region] = None) -> Optional[Tuple[int, int]]:
+    m = locate_image_match(path, region)
+    if m is None:
+        return None
+    return m.x, m.y
+
+
+def locate_any_image(
+    directory: str,
+    region: Optional[Region] = None,
+    threshold: Optional[float] = None,
+) -> List[IconHit]:
+    library = get_library(directory)
+    img, ox, oy = _grab(region)
+    with span("match.template", icons=len(library.pyramids)):
+        hits = library.match_all(img) if threshold is None else library.match_all(img, threshold)
+    return [
+        h._replace(x=h.x + ox, y=h.y + oy, box=(h.box[0] + ox, h.box[1] + oy, h.box[2], h.box[3]))
+        for h in hits
+    ]
+
+
+def warm(act: str, args: Mapping[str, Any], region: Optional[Region] = None) -> None:
+    # Speculative work for an upcoming step. OCR results land in the
+    # fingerprint-keyed cache, so they are reused only if the screen is
+    # unchanged when the step actually runs.
+    if act in OCR_ACTIONS:
+        _ocr(*_grab(region))
+    elif act == "locate_image":
+        tpl = load_template(str(args.get("path", "")))
+        for scale in TEMPLATE_SCALES:
+            tpl.pyramid(scale)
+    elif act == "locate_any_image":
+        get_library(str(args.get("dir", "")))
@@ -0,0 +1,202 @@
+import os
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from backends import get_capture, get_input
+from cancel import CANCEL
+from config import TARGET_CACHE_ENABLED
+from plan import Resolution, Step
+from targets import TARGET_CACHE, target_key
+from tracing import CHECK_SPAN, span
+from vision import (
+    Region,
+    last_searched,
+    locate_any_image,
+    locate_image,
+    locate_text,
+    locate_texts,
+    region_fingerprint,
+)
+from waiter import wait_until, wait_for_change
+
+# Execution of locate_* and wait_* steps. Everything that needs OpenCV,
+# NumPy or Tesseract is reached from here, and the executor imports this
+# module only when the first such step runs.
+
+
+def first_found(found: Dict[str, list], queries: List[str], need_all: bool) -> Optional[Tuple[int, int]]:
+    # Position of the first query (in the given order) that matched.
+    if need_all and not all(found[q] for q in queries):
+        return None
+    for q in queries:
+        if found[q]:
+            return found[q][0].x, found[q][0].y
+    return None
+
+
+def _previewed(resolved: Optional[Resolution], region: Optional[Region]) -> Optional[Tuple[int, int]]:
+    # The preview's match, if the searched area has not changed since.
+    if resolved is None:
+        return None
+    try:
+        if region_fingerprint(region, max_age=0) != resolved.fingerprint:
+            return None
+    except ValueError:
+        return None
+    return resolved.x, resolved.y
+
+
+def _retry_until(
+    fn: Callable[[], Optional[Tuple[int, int]]],
+    timeout_s: float,
+    interval_s: float,
+    retries: int,
+    region: Optional[Region] = None,
+) -> Tuple[Optional[Tuple[int, int]], str]:
+    if timeout_s > 0:
+        return wait_until(fn, timeout_s, interval_s, region)
+
+    attempts = max(0, retries)
+    for i in range(attempts + 1):
+        with span(CHECK_SPAN):
+            pos = fn()
+        if pos:
+            return pos, ""
+        if i < attempts and CANCEL.wait(interval_s):
+            return None, "cancelled"
+    return None, f"not found after {attempts + 1} attempts"
+
+
+def _search(
+    fn: Callable[[], Optional[Tuple[int, int]]],
+    args: Mapping[str, Any],
+    region: Optional[Region],
+    not_found: str,
+    query: Optional[str],
+    allowlist: List[str],
+    resolved: Optional[Resolution],
+) -> Tuple[Optional[Tuple[int, int]], str]:
+    # Without searching, use the step preview's match when the screen is
+    # unchanged, else a target-cache entry (keyed by query) whose pixels
+    # still match. query None bypasses the target cache.
+    key = target_key(query, allowlist) if TARGET_CACHE_ENABLED and query is not None else None
+    pos = _previewed(resolved, region)
+    fresh = pos is not None
+    if pos is None and key:
+        pos = TARGET_CACHE.lookup(key, region)
+    if pos is None:
+        try:
+            pos, reason = _retry_until(fn, args["timeout"], args["interval"], args["retries"], region)
+        except ValueError as e:
+            return None, str(e)
+        if not pos:
+            return None, f"{not_found} ({reason})"
+        fresh = True
+    if key and fresh:
+        # The frame the match was made in (or, for a preview hit, the fresh
+        # frame that proved the screen unchanged)
+        searched = last_searched()
+        if searched is not None:
+            TARGET_CACHE.store(key, pos, searched)
+    return pos, ""
+
+
+def locate(step: Step, region: Optional[Region], allowlist: List[str]) -> Tuple[Optional[Tuple[int, int]], str]:
+    # Target position of a locate_* step, or (None, reason).
+    act = step.action
+    args = step.args
+
+    if act == "locate_text":
+        query = args["text"]
+        return _search(
+            lambda: locate_text(query, region),
+            args,
+            region,
+            f"text not found: {query}",
+            f"text:{query.lower()}",
+            allowlist,
+            step.resolved,
+        )
+
+    if act == "locate_texts":
+        queries = list(args["texts"])
+        need_all = args["mode"] == "all"
+        return _search(
+            lambda: first_found(locate_texts(queries, region, limit=1), queries, need_all),
+            args,
+            region,
+            f"texts not found ({'all' if need_all else 'any'}): {' | '.join(queries)}",
+            # A cached point only proves the first text is still there
+            None if need_all else f"texts:any:{'|'.join(queries).lower()}",
+            allowlist,
+            step.resolved,
+        )
+
+    if act == "locate_image":
+        path = args["path"]
+        return _search(
+            lambda: locate_image(path, region),
+            args,
+            region,
+            f"image not found: {path}",
+            f"image:{os.path.abspath(path)}",
+            allowlist,
+            step.resolved,
+        )
+
+    if act == "locate_any_image":
+        directory = args["dir"]
+        threshold = args["threshold"]
+
+        def _best_icon() -> Optional[Tuple[int, int]]:
+            hits = locate_any_image(directory, region, threshold)
+            return (hits[0].x, hits[0].y) if hits else None
+
+        return _search(
+            _best_icon,
+            args,
+            region,
+            f"no image from {directory} found",
+            f"icons:{os.path.abspath(directory)}:{threshold}",
+            allowlist,
+            step.resolved,
+        )
+
+    return None, f"unknown action: {act}"
+
+
+def wait(step: Step, region: Optional[Region]) -> Tuple[bool, str]:
+    act = step.action
+    args = step.args
+
+    if act == "wait_for_change":
+        try:
+            return wait_for_change(args["timeout"], args["interval"], region)
+        except ValueError as e:
+            return False, str(e)
+
+    if act == "wait_until_text_gone":
+        query = args["text"]
+        timeout_s = args["timeout"]
+        try:
+            gone, reason = wait_until(lambda: locate_text(query, region) is None, timeout_s, args["interval"], region)
+        except ValueError as e:
+            return False, str(e)
+        if not gone:
+            return False, f"text still visible: {query} (after {timeout_s:.1f}s)"
+        return True, ""
+
+    return False, f"unknown action: {act}"
+
+
+def warm_up() -> None:
+    # Importing this module loaded OpenCV, NumPy and pytesseract; also
+    # start the capture/input backends, the tesseract pool, the OCR tile
+    # workers and the target cache so the first locate step pays for none
+    # of them.
+    import ocr
+
+    get_capture()
+    get_input()
+    ocr.ocr_engine_name()
+    ocr.warm_tiles()
+    TARGET_CACHE.load()
@@ -0,0 +1,90 @@
+import time
+from typing import Callable, Optional, Tuple, TypeVar
+
+import cv2
+import numpy as np
+
+from cancel import CANCEL
+from capture import grab_gray_at
+from config import WAIT_MIN_INTERVAL, WAIT_BACKOFF, WAIT_RECHECK, WAIT_PIXEL_DELTA
+from tracing import CHECK_SPAN, span
+
+T = TypeVar("T")
+
+# Thumbnails are this many times smaller than the screen on each side
+_THUMB_FACTOR = 8
+
+
+def _thumb(region: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
+    gray, (ox, oy) = grab_gray_at(max_age=0)
+    if region is not None:
+        x, y, w, h = region
+        x, y = x - ox, y - oy
+        fh, fw = gray.shape[:2]
+        gray = gray[max(0, y):min(fh, y + h), max(0, x):min(fw, x + w)]
+    h, w = gray.shape[:2]
+    if h == 0 or w == 0:
+        raise ValueError(f"region outside screen: {region}")
+    size = (max(1, w // _THUMB_FACTOR), max(1, h // _THUMB_FACTOR))
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+
+def _changed(a: np.ndarray, b: np.ndarray) -> bool:
+    if a.shape != b.shape:
+        return True
+    return bool((cv2.absdiff(a, b) > WAIT_PIXEL_DELTA).any())
+
+
+def wait_until(
+    check: Callable[[], Optional[T]],
+    timeout_s: float,
+    max_interval: float,
+    region: Optional[Tuple[int, int, int, int]] = None,
+) -> Tuple[Optional[T], str]:
+    # Sample cheap thumbnails often and run the expensive check only when
+    # the watched area changed (or every WAIT_RECHECK seconds regardless).
+    # The thumbnail capture refreshes the shared frame, so the check reuses it.
+    end = time.time() + timeout_s
+    prev = _thumb(region)
+    with span(CHECK_SPAN):
+        result = check()
+    if result:
+        return result, ""
+    last_check = time.time()
+    delay = WAIT_MIN_INTERVAL
+    while True:
+        now = time.time()
+        if now >= end:
+            return None, f"not found within {timeout_s:.1f}s"
+        if CANCEL.wait(min(delay, end - now)):
+            return None, "cancelled"
+        cur = _thumb(region)
+        if _changed(prev, cur) or time.time() - last_check >= WAIT_RECHECK:
+            with span(CHECK_SPAN):
+                result = check()
+            last_check = time.time()
+            if result:
+                return result, ""
+            prev = cur
+            delay = WAIT_MIN_INTERVAL
+        else:
+            delay = min(delay * WAIT_BACKOFF, max_interval)
+
+
+def wait_for_change(
+    timeout_s: float,
+    max_interval: float,
+    region: Optional[Tuple[int, int, int, int]] = None,
+) -> Tuple[bool, str]:
+    end = time.time() + timeout_s
+    base = _thumb(region)
+    delay = WAIT_MIN_INTERVAL
+    while True:
+        now = time.time()
+        if now >= end:
+            return False, f"no change within {timeout_s:.1f}s"
+        if CANCEL.wait(min(delay, end - now)):
+            return False, "cancelled"
+        if _changed(base, _thumb(region)):
+            return True, ""
+        delay = min(delay * WAIT_BACKOFF, max_interval)
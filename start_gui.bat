@@ -3,6 +3,6 @@ cd /d "%~dp0"
 "C:\Users\Admin\miniconda3\python.exe" src\main.py
 if errorlevel 1 (
   echo.
-  echo App crashed. See app.log for details.
+  echo App crashed. See trace.jsonl for details.
 )
 pause